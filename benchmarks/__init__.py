@@ -0,0 +1,25 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks of the modelx comm handlers of ModelxKernel
+
+The handlers are called on synthetic models through a fake comm,
+without running a kernel or Spyder, and the latency and the size of
+the reply of each call are reported as JSON::
+
+    python -m benchmarks --spaces 20 --cells 50 --output result.json
+
+Run ``python -m benchmarks --help`` for the model parameters.
+"""
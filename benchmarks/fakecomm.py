@@ -0,0 +1,47 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+from jupyter_client.session import json_packer
+
+
+class FakeComm:
+    """Call comm handlers of a kernel as the frontend comm does
+
+    :meth:`call` returns the return value of a handler and the size of
+    the reply the comm would send, which is the return value in a buffer
+    if it is bytes, or in the JSON content of the reply otherwise.
+    """
+
+    def __init__(self, kernel):
+        self.kernel = kernel
+
+    def call(self, name, *args, **kwargs):
+        return_value = getattr(self.kernel, name)(*args, **kwargs)
+
+        buffers = []
+        if isinstance(return_value, bytes):
+            buffers.append(return_value)
+            reply_value = None
+        else:
+            reply_value = return_value
+
+        content = {
+            'is_error': False,
+            'call_id': '',
+            'call_name': name,
+            'call_return_value': reply_value
+        }
+        size = len(json_packer(content)) + sum(len(b) for b in buffers)
+
+        return return_value, size
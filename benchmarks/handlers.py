@@ -0,0 +1,136 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import argparse
+import importlib
+import json
+import platform
+import statistics
+import sys
+import time
+
+import cloudpickle
+
+from benchmarks.models import build_model
+from benchmarks.fakecomm import FakeComm
+
+KERNEL_MODULES = ("kernel", "kernel_5")
+
+
+def make_kernel(module):
+    """Create ModelxKernel in spymx_kernels.console.module without starting
+
+    Messages sent by send_mx_msg are discarded.
+    """
+    mod = importlib.import_module("spymx_kernels.console." + module)
+    kernel = object.__new__(mod.ModelxKernel)
+    if hasattr(kernel, "_init_mx_state"):
+        kernel._init_mx_state()
+    kernel.send_mx_msg = lambda *args, **kwargs: None
+    return kernel
+
+
+def get_calls(model, depth):
+    """Return a list of (handler name, args) to benchmark"""
+    args = cloudpickle.dumps((0,))
+    space = model.name + ".S0"
+    last = space + ".c%d" % (depth - 1)
+    return [
+        ("mx_get_modellist", ()),
+        ("mx_get_attrdict", (model.name, None, False)),
+        ("mx_get_attrdict", (model.name, None, True)),
+        ("mx_adj_node", (last, args, "preds")),
+        ("mx_adj_node", (space + ".c0", args, "succs")),
+        ("mx_get_value_info", (model.name,)),
+        ("mx_node_value", (last, args, False))
+    ]
+
+
+def run(modules=KERNEL_MODULES, repeat=5, **params):
+    """Run the benchmarks and return the result as a dict
+
+    params are passed to :func:`~benchmarks.models.build_model`.
+    Each call is repeated repeat times, and the minimum, median and
+    maximum seconds and the size of the reply in bytes are reported.
+    """
+    model = build_model(**params)
+    depth = min(params.get("depth", 5), params.get("cells", 10))
+    results = []
+    try:
+        for module in modules:
+            comm = FakeComm(make_kernel(module))
+            for name, args in get_calls(model, depth):
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    _, size = comm.call(name, *args)
+                    times.append(time.perf_counter() - start)
+
+                results.append({
+                    "kernel": module,
+                    "handler": name,
+                    "args": [a if not isinstance(a, bytes) else "<bytes>"
+                             for a in args],
+                    "min": min(times),
+                    "median": statistics.median(times),
+                    "max": max(times),
+                    "bytes": size
+                })
+    finally:
+        model.close()
+
+    return {
+        "params": dict(params, repeat=repeat),
+        "environment": get_environment(),
+        "results": results
+    }
+
+
+def get_environment():
+    import modelx
+    import spyder_kernels
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "modelx": modelx.__version__,
+        "spyder_kernels": spyder_kernels.__version__
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark ModelxKernel comm handlers")
+    parser.add_argument("--kernel", nargs="+", choices=KERNEL_MODULES,
+                        default=list(KERNEL_MODULES),
+                        help="Kernel modules to benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    for name, default in [("spaces", 10), ("cells", 10), ("itemspaces", 10),
+                          ("refs", 10), ("depth", 5), ("points", 10)]:
+        parser.add_argument("--" + name, type=int, default=default)
+    parser.add_argument("--output", default=None,
+                        help="File to write the result. stdout if not given")
+    args = vars(parser.parse_args(argv))
+
+    modules = args.pop("kernel")
+    output = args.pop("output")
+    result = run(modules, **args)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
@@ -0,0 +1,52 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+import modelx as mx
+
+
+def build_model(name="Bench", spaces=10, cells=10, itemspaces=10,
+                refs=10, depth=5, points=10):
+    """Create a synthetic model
+
+    The model has spaces named S0, S1, ... each with cells named
+    c0, c1, ..., refs named r0, r1, ... and a parameter i.
+    The cells form chains of depth cells, in which each cells calls
+    the previous one, and values of all the cells are calculated
+    for x in range(points). ItemSpaces are created for i
+    in range(itemspaces).
+    """
+    model = mx.new_model(name)
+
+    for s in range(spaces):
+        space = model.new_space("S%d" % s, formula=lambda i: None)
+
+        for c in range(cells):
+            if c % depth:
+                formula = "def c%d(x): return c%d(x) + 1" % (c, c - 1)
+            else:
+                formula = "def c%d(x): return x" % c
+            space.new_cells("c%d" % c, formula=formula)
+
+        for r in range(refs):
+            setattr(space, "r%d" % r, r)
+
+        for c in range(cells):
+            cells_obj = space.cells["c%d" % c]
+            for x in range(points):
+                cells_obj(x)
+
+        for i in range(itemspaces):
+            space[i]
+
+    return model
@@ -86,7 +86,7 @@ setup(
     description="Jupyter kernels for Spyder plugin for modelx",
     long_description=LONG_DESCRIPTION,
     long_description_content_type='text/markdown',
-    packages=find_packages(exclude=['docs', '*tests']),
+    packages=find_packages(exclude=['docs', '*tests', 'benchmarks', 'benchmarks.*']),
     install_requires=REQUIREMENTS,
     extras_require={'test': TEST_REQUIREMENTS},
     include_package_data=True,
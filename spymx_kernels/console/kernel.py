@@ -43,9 +43,15 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 
 from types import ModuleType
+import os
 import json
 import ast
 import logging
+import heapq
+import warnings
+import zlib
+from collections import OrderedDict
+from functools import wraps
 
 import cloudpickle
 import spyder_kernels
@@ -54,44 +60,230 @@ from spyder_kernels.comms.decorators import comm_handler
 from spyder_kernels.utils.nsview import value_to_display
 
 from spymx_kernels.utility.tupleencoder import hinted_tuple_hook
+from spymx_kernels.utility.treesync import TreeVersions, same_signature
+from spymx_kernels.utility.serialize import (
+    dumps_oob, iter_chunks, WireEncoder)
+from spymx_kernels.utility.previewcache import PreviewCache
+from spymx_kernels.utility.jobs import Job, JobCancelled
+from spymx_kernels.utility.handlerstats import HandlerStats
+from spymx_kernels.utility.memsize import deep_sizeof
+from spymx_kernels.utility.formulaprofile import (
+    PROFILE_COLUMNS, DEFAULT_MAXLEN, summarize_stacktrace)
 from spymx_kernels.utility.typeutil import (
-    is_instance_of,
-    is_numpy_number, numpy_to_py)
+    is_class_of, is_numpy_number_type, numpy_to_py, TypeDispatcher)
 
 _spykern_ver = tuple(int(i) for i in spyder_kernels.__version__.split(".")[:3])
 
 logger = logging.getLogger(__name__)
 
+# Names of views that _get_attrdict expands when recursive is True
+_CHILD_VIEWS = ("spaces", "named_spaces", "_named_itemspaces", "cells", "refs")
+
+# Trees whose change counters are kept for mx_get_attrdict with since
+_MAX_TREES = 16
+
+# Mutated objects recorded before taking all objects as mutated
+_MAX_MUTATED = 1000
+
+# Comm handlers not touching modelx, which can be called while
+# a calculation runs or a model is read or written in a background job.
+# The other handlers raise RuntimeError, as modelx keeps the states of
+# calculations and serialization globally.
+_JOB_SAFE_HANDLERS = frozenset([
+    "mx_get_startup_timing",
+    "mx_cancel_job",
+    "mx_batch",     # Checks each call
+    "mx_negotiate_encoding",
+    "mx_kernel_stats",
+    "mx_preview_cache_stats",
+    "mx_clear_preview_cache",
+    "mx_cancel_stream",
+    "mx_poll_value",
+    # SpyderKernel handlers not touching namespace
+    "get_fault_text",
+    "get_current_frames",
+    "get_matplotlib_backend",
+    "get_mpl_interactive_backend",
+    "set_matplotlib_conf",
+    "set_configuration",
+    "get_syspath",
+    "get_env",
+    "close_all_mpl_figures",
+    "update_syspath",
+    "get_pythonenv_info",
+    # SpyderKernel handlers only reading the namespace for the Variable
+    # Explorer. They take types, sizes and reprs of variables, which do not
+    # calculate or change modelx objects, so the Variable Explorer keeps
+    # working during long calculations.
+    "get_namespace_view",
+    "get_var_properties"
+])
+
 # Modified from spyder_kernels\comms\decorators.py in spyder-kernels 3.0.3
-def register_class_comm_handlers(instance, cls, frontend_comm):
+def register_class_comm_handlers(instance, cls, frontend_comm, wrap=None):
     """
     Registers an instance whose methods have been marked with comm_handler.
+
+    If wrap is given, wrap(method_name, method) is registered instead.
     """
     for method_name in cls.__dict__:
         method = getattr(instance, method_name)
         if hasattr(method, '_is_comm_handler'):
+            if wrap is not None:
+                method = wrap(method_name, method)
             frontend_comm.register_call_handler(
                 method_name, method)
 
+def _type_string(value):
+    return "Type: " + value.__class__.__name__
+
+
+def _make_sendval_converter():
+    """Make TypeDispatcher to return converter for _to_sendval
+
+    The converter of a value is None if the value is sent as is.
+    Version dependent classes are resolved here once.
+    """
+    import modelx
+    mxver = tuple(int(i) for i in modelx.__version__.split(".")[:3])
+    from modelx.core.cells import Interface
+
+    if mxver < (0, 18, 0):
+        from modelx.io.baseio import BaseDataClient as iospec
+    elif mxver < (0, 20, 0):
+        from modelx.io.baseio import BaseDataSpec as iospec
+    else:
+        from modelx.io.baseio import BaseIOSpec as iospec
+
+    def classify(type_):
+
+        if issubclass(type_, (Interface, str, iospec, ModuleType)):
+            return repr
+
+        elif any(
+                is_class_of(type_, c, "pandas") for c in [
+                    "DataFrame", "Index", "Series"
+                ]):
+            return _type_string
+
+        elif any(
+            is_class_of(type_, c, "numpy") for c in [
+                "ndarray", "MaskedArray"
+            ]):
+            return _type_string
+
+        elif issubclass(type_, (list, set, tuple, dict)):
+            return _type_string
+
+        elif is_numpy_number_type(type_):
+            return numpy_to_py[type_.__name__]
+        else:
+            return None
+
+    return TypeDispatcher(classify)
+
+
+_sendval_converter = None
+
+
+def _without_names(attrdict, names):
+    """Return a copy of a non-recursive attrdict without names in views"""
+    return {key: tuple(n for n in value if n not in names)
+            if key in _CHILD_VIEWS else value
+            for key, value in attrdict.items()}
+
+
 class ModelxKernel(SpyderKernel):
 
     def __init__(self, *args, **kwargs):
         super(ModelxKernel, self).__init__(*args, **kwargs)
+        self._init_mx_state()
+
+        # Handlers registered by SpyderKernel.__init__ are replaced with
+        # the ones wrapped to record the statistics.
+        register_class_comm_handlers(
+            self, ModelxKernel, self.frontend_comm, self._wrap_handler)
 
         # Base classes handlers are not registered in SpyderKernel.__init__
-        register_class_comm_handlers(self, SpyderKernel, self.frontend_comm)
+        register_class_comm_handlers(
+            self, SpyderKernel, self.frontend_comm, self._wrap_handler)
+
+        # Code run in the console waits for calculations in background
+        self.shell.events.register('pre_execute', self._mx_pre_execute)
+
+        # Code run in the console can mutate models in any way
+        self.shell.events.register('post_execute', self._mx_post_execute)
+
+    def _init_mx_state(self):
+        """Initialize the states used by the handlers
+
+        Separated from __init__ so that the handlers can run on
+        an instance created without starting a kernel, such as in benchmarks.
+        """
+        # Statistics of comm handler calls
+        self._mx_stats = HandlerStats()
+
+        # Encoder of pickled data sent to the frontend
+        self._mx_encoder = WireEncoder()
+
+        # Change counters for mx_get_attrdict with since and the
+        # mutation count when the tree was last walked,
+        # keyed by (fullname, attrs) from the least recently used
+        self._mx_tree_versions = OrderedDict()
+
+        # Mutation counts of objects by fullname, and the mutation
+        # count after which all objects are taken as mutated
+        self._mx_mutation_count = 0
+        self._mx_mutated = {}
+        self._mx_mutated_all = 0
+
+        # States of values being streamed by mx_stream_value
+        self._mx_streams = {}
+        self._mx_stream_count = 0
 
+        # Previews of node values by value_to_display
+        self._mx_previews = PreviewCache()
+
+        # Background jobs by job id
+        self._mx_jobs = {}
+        self._mx_job_count = 0
+
+        # Objects by fullname looked up by _get_object
+        self._mx_objects = {}
+
+        # Job of the calculation started by _get_value_within
+        self._mx_calc_job = None
+
+        # Job reading or writing a model, as modelx serializes
+        # only one model at a time
+        self._mx_io_job = None
+
+        # Mutations collected to publish in mxchanged, and the seconds
+        # to collect mutations before publishing them
+        self._mx_changes = None
+        self._mx_change_window = 0.05
 
     def get_modelx(self):
         from modelx.core import mxsys
         return mxsys
 
+    @comm_handler
+    def mx_get_startup_timing(self):
+        """Get a list of (phase, seconds) taken to start the kernel.
+
+        The list is empty if the kernel is not started by
+        spymx_kernels.console.start.
+        """
+        from spymx_kernels.console.start import startup_timing
+        return startup_timing
+
     @comm_handler
     def mx_new_model(self, name=None, define_var=False, varname=''):
         import modelx as mx
         model = mx.new_model(name)
         if define_var:
             self._define_var(model, varname)
+        self._mx_changed(added=[model.fullname])
 
     @comm_handler
     def mx_read_model(self, modelpath, name, define_var, varname):
@@ -99,23 +291,211 @@ class ModelxKernel(SpyderKernel):
         model = mx.read_model(modelpath, name)
         if define_var:
             self._define_var(model, varname)
+        self._mx_changed(added=[model.fullname])
+
+    @comm_handler
+    def mx_read_model_async(self, modelpath, name, define_var, varname,
+                            attrs=None):
+        """Read a model in a background thread.
+
+        Same as mx_read_model except that the model is read in a thread
+        and the job id is returned immediately.
+
+        While reading, a message of type "mxjobprogress" is published
+        each time the thread opens a file in the model, with content
+        having "job", "count" of files opened so far, "total" number of
+        files in the model and "path" of the file relative to modelpath.
+        As all the files in a zipped model are read through the zip file,
+        for a zipped model, path is always blank, total is None
+        and count is the number of times the zip file is opened.
+
+        When finished, a message of type "mxjobdone" is published
+        with content having "job" and "error", which is None
+        if the model is read successfully. Its data is the recursive
+        attrdict of the model with attrs, or None on error.
+        The job can be cancelled by mx_cancel_job, in which case
+        the partially read model is closed.
+        Until the job finishes, handlers touching modelx raise
+        RuntimeError, and code run in the console waits, as modelx
+        keeps the state of reading globally.
+        """
+        import modelx as mx
+
+        existing = mx.get_models().get(name) if name else None
+
+        def on_done(job):
+            self.io_loop.add_callback(
+                self._finish_read_job, job, name, existing,
+                define_var, varname, attrs)
+
+        jobid = self._start_job(
+            lambda job: mx.read_model(modelpath, name),
+            self._get_progress_callback(
+                modelpath, self._count_model_files(modelpath)),
+            on_done)
+        self._mx_io_job = self._mx_jobs[jobid]
+        return jobid
+
+    def _get_progress_callback(self, modelpath, total):
+        """Get on_open callback of Job to publish mxjobprogress
+
+        If total is given, only regular files under modelpath are
+        counted as by _count_model_files, and count never exceeds total.
+        """
+        root = os.path.abspath(modelpath)
+        count = 0
+
+        def on_open(job, path, mode):
+            nonlocal count
+            if not isinstance(path, (str, bytes, os.PathLike)):
+                return
+            path = os.path.abspath(os.fsdecode(path))
+            if total is not None:
+                if not (path.startswith(root + os.sep)
+                        and os.path.isfile(path)):
+                    return
+                count = min(count + 1, total)
+            elif path == root or path.startswith(root + os.sep):
+                count += 1
+            else:
+                return
+
+            self.io_loop.add_callback(
+                self.send_mx_msg, "mxjobprogress", content={
+                    "job": job.id,
+                    "count": count,
+                    "total": total,
+                    "path": os.path.relpath(path, root)
+                    if path != root else ""
+                })
+
+        return on_open
+
+    def _finish_read_job(self, job, name, existing, define_var, varname,
+                         attrs):
+        """Finish mx_read_model_async job
+
+        existing is the model named name when the job started.
+        modelx closes the model being read if reading fails, and
+        the model named name is closed in case it is left open
+        unless it is existing. Models not read by the job are left open.
+        """
+        import modelx as mx
+
+        if job.error is None:
+            model = job.result
+            if define_var:
+                self._define_var(model, varname)
+            data = model._get_attrdict(attrs, recursive=True)
+            self._mx_changed(added=[model.fullname])
+        else:
+            model = mx.get_models().get(name) if name else None
+            if model is not None and model is not existing:
+                model.close()
+            data = None
+
+        self._finish_job(job, data)
+
+    def _finish_job(self, job, data=None):
+        """Remove finished job and publish mxjobdone"""
+        self._mx_jobs.pop(job.id, None)
+        if job is self._mx_io_job:
+            self._mx_io_job = None
+        self.send_mx_msg("mxjobdone", content={
+            "job": job.id,
+            "error": None if job.error is None else repr(job.error)
+        }, data=data)
+
+    def _count_model_files(self, path):
+        if os.path.isdir(path):
+            return sum(len(files) for _, _, files in os.walk(path))
+        else:
+            return None
+
+    def _start_job(self, func, on_open=None, on_done=None, stack_size=None):
+        """Start func in a background Job and return its id"""
+        self._mx_job_count += 1
+        job = Job(func, on_open=on_open, on_done=on_done,
+                  stack_size=stack_size)
+        job.id = self._mx_job_count
+        self._mx_jobs[job.id] = job
+        job.start()
+        return job.id
 
     @comm_handler
-    def mx_write_model(self, model, modelpath, backup, zipmodel):
+    def mx_cancel_job(self, jobid):
+        """Cancel a background job. Returns False if the job is not running
+
+        Calculations by mx_node_value stop at the next formula call, and
+        their results are discarded, including ones already finished.
+        Cancelled calculations are kept until polled by mx_poll_value,
+        which raises RuntimeError.
+        """
+        job = self._mx_jobs.get(jobid)
+        if job is None:
+            return False
+        elif job.done:
+            del self._mx_jobs[jobid]
+            if job is self._mx_calc_job:
+                self._mx_calc_job = None
+            return False
+        job.cancel()
+        return True
+
+    @comm_handler
+    def mx_write_model(self, model, modelpath, backup, zipmodel,
+                       compresslevel=None):
+        self._write_model(model, modelpath, backup, zipmodel, compresslevel)
+
+    def _write_model(self, model, modelpath, backup, zipmodel, compresslevel):
         import modelx as mx
         if zipmodel:
-            mx.zip_model(mx.get_models()[model], modelpath, backup)
+            kwargs = {}
+            if compresslevel is not None:
+                kwargs["compresslevel"] = compresslevel
+            mx.zip_model(mx.get_models()[model], modelpath, backup, **kwargs)
         else:
             mx.write_model(mx.get_models()[model], modelpath, backup)
 
+    @comm_handler
+    def mx_write_model_async(self, model, modelpath, backup, zipmodel,
+                             compresslevel=None):
+        """Write a model in a background thread.
+
+        Same as mx_write_model except that the model is written in a thread
+        and the job id is returned immediately.
+        compresslevel is passed to zipfile for zipmodel, from 0 for
+        the fastest to 9 for the smallest.
+        Messages of type "mxjobprogress" and "mxjobdone" are published
+        as mx_read_model_async, except that total is None and
+        data of "mxjobdone" is None. For a zipped model, "mxjobprogress"
+        may not be published, depending on how modelx writes the zip file.
+        The job can be cancelled by mx_cancel_job, in which case
+        the written files are incomplete.
+        Until the job finishes, handlers touching modelx raise
+        RuntimeError, and code run in the console waits,
+        so that the model is not changed while being written.
+        """
+        def on_done(job):
+            self.io_loop.add_callback(self._finish_job, job)
+
+        jobid = self._start_job(
+            lambda job: self._write_model(
+                model, modelpath, backup, zipmodel, compresslevel),
+            self._get_progress_callback(modelpath, None),
+            on_done)
+        self._mx_io_job = self._mx_jobs[jobid]
+        return jobid
+
     @comm_handler
     def mx_new_space(self, model, parent, name, bases, define_var, varname):
         import modelx as mx
 
+        new_model = not model and mx.cur_model() is None
         model = self._get_or_create_model(model)
 
         if parent:
-            parent = mx.get_object(parent)
+            parent = self._get_object(parent)
         else:
             parent = model
 
@@ -130,25 +510,226 @@ class ModelxKernel(SpyderKernel):
         space = parent.new_space(name=name, bases=bases)
         if define_var:
             self._define_var(space, varname)
+        added = [space.fullname]
+        if new_model:
+            added.insert(0, model.fullname)
+        self._mx_changed(added=added)
 
     @comm_handler
     def mx_del_object(self, parent, name):
-        import modelx as mx
-        mx.get_object(parent).__delattr__(name)
+        self._get_object(parent).__delattr__(name)
+        self._mx_previews.invalidate(parent + "." + name)
+        self._mx_changed(removed=[parent + "." + name])
 
     @comm_handler
     def mx_del_model(self, name):
         import modelx as mx
         mx.get_models()[name].close()
+        self._mx_previews.invalidate(name)
+        self._mx_changed(removed=[name])
+
+    def _mx_changed(self, added=(), removed=(), changed=()):
+        """Record fullnames of mutated objects to publish in mxchanged
+
+        Mutations recorded within _mx_change_window seconds of the first
+        are published in one mxchanged message, whose content has
+        "added", "removed" and "changed" lists of fullnames. Mutations
+        cancelling each other, such as an object added then removed,
+        are netted out. Children of removed objects are not listed,
+        nor are parents of added or removed objects listed as changed.
+        Copies of mutated objects in derived spaces are listed
+        as mutated objects are, by _with_inherited_copies.
+        Mutations made by code run in the console are not recorded.
+        """
+        changes = self._mx_changes
+        if changes is None:
+            changes = self._mx_changes = {
+                "added": set(), "removed": set(), "changed": set()}
+            self.io_loop.call_later(
+                self._mx_change_window, self._publish_changes)
+
+        if removed:
+            self._mx_clear_object_index()
+
+        added, removed, changed = self._with_inherited_copies(
+            added, removed, changed)
+
+        for name in added:
+            if name in changes["removed"]:
+                changes["removed"].discard(name)
+                changes["changed"].add(name)
+            else:
+                changes["added"].add(name)
+
+        self._mark_mutated([*added, *removed, *changed])
+
+        for name in removed:
+            prefix = name + "."
+            for kind in ("added", "removed", "changed"):
+                changes[kind] = {n for n in changes[kind]
+                                 if not n.startswith(prefix)}
+            if name in changes["added"]:
+                changes["added"].discard(name)
+            else:
+                changes["changed"].discard(name)
+                changes["removed"].add(name)
+
+        for name in changed:
+            if name not in changes["added"]:
+                changes["changed"].add(name)
+
+    def _with_inherited_copies(self, added, removed, changed):
+        """Add copies of mutated objects in derived spaces to mutations
+
+        Returns lists of added, removed and changed fullnames.
+        Copies of added objects are taken as added if they exist,
+        and copies of removed objects as removed if they do not exist.
+        Otherwise, such as when copies are overridden by objects
+        defined in derived spaces, existing copies are taken as changed.
+        """
+        result = {"added": list(added), "removed": list(removed),
+                  "changed": list(changed)}
+
+        for kind, names in (("added", added), ("removed", removed),
+                            ("changed", changed)):
+            for name in names:
+                try:
+                    subs = list(self._iter_inheriting_names(name))
+                except (AttributeError, KeyError, NameError):
+                    continue    # Not inherited by derived spaces
+                for sub in subs:
+                    try:
+                        self._get_object(sub, as_proxy=True)
+                        exists = True
+                    except NameError:
+                        exists = False
+                    if kind == "added" and exists:
+                        result["added"].append(sub)
+                    elif kind == "removed" and not exists:
+                        result["removed"].append(sub)
+                    elif exists:
+                        result["changed"].append(sub)
+
+        return result["added"], result["removed"], result["changed"]
+
+    def _get_object(self, fullname, as_proxy=False):
+        """Same as mx.get_object but looks up _mx_objects first
+
+        Objects other than refs are kept in _mx_objects and returned
+        while they are valid and have the same fullname, so that
+        objects deleted, or renamed such as models replaced by
+        new models of the same names, are looked up again.
+        The index is cleared when objects are removed by the handlers
+        and after code is executed in the console.
+        """
+        import modelx as mx
+        from modelx.core.base import Interface
+
+        obj = self._mx_objects.get(fullname)
+        if obj is not None and obj._is_valid() and obj.fullname == fullname:
+            return obj
+
+        obj = mx.get_object(fullname, as_proxy)
+        if isinstance(obj, Interface):
+            self._mx_objects[fullname] = obj
+
+        return obj
+
+    def _mx_clear_object_index(self):
+        self._mx_objects.clear()
+
+    def _wrap_handler(self, name, func):
+        """Wrap comm handler to check background jobs and record statistics"""
+        if name not in _JOB_SAFE_HANDLERS:
+            handler = func
+
+            @wraps(handler)
+            def func(*args, **kwargs):
+                self._check_jobs_idle()
+                return handler(*args, **kwargs)
+
+        return self._mx_stats.wrap(name, func)
+
+    def _mx_pre_execute(self):
+        """Wait for background jobs using modelx before running code
+
+        Exceptions raised in pre_execute callbacks do not stop the code,
+        so the code is kept from running by waiting. On interrupt
+        while waiting, the job is cancelled and waited for to stop
+        at the next formula call or file open.
+        """
+        for job in (self._mx_calc_job, self._mx_io_job):
+            if job is None or job.done:
+                continue
+            try:
+                job.thread.join()
+            except KeyboardInterrupt:
+                job.cancel()
+                job.thread.join()
+
+    def _mx_post_execute(self):
+        self._mx_clear_object_index()
+        self._mx_previews.invalidate()  # Values may be mutated in place
+        self._mark_all_mutated()
+
+    def _mark_mutated(self, names):
+        """Mark objects of names and objects inheriting them as mutated
+
+        All objects are marked if mutated objects may be inherited in
+        a way not traced, such as references in models.
+        """
+        self._mx_mutation_count += 1
+        count = self._mx_mutation_count
+        mutated = self._mx_mutated
+        try:
+            for name in names:
+                mutated[name] = count
+                for sub in self._iter_inheriting_names(name):
+                    mutated[sub] = count
+        except (AttributeError, KeyError, NameError):
+            self._mark_all_mutated()
+            return
+
+        if len(mutated) > _MAX_MUTATED:
+            self._mark_all_mutated()
+
+    def _mark_all_mutated(self):
+        self._mx_mutation_count += 1
+        self._mx_mutated_all = self._mx_mutation_count
+        self._mx_mutated.clear()
+
+    def _iter_inheriting_names(self, fullname):
+        """Yield fullnames of objects inheriting the object of fullname
+
+        Raises KeyError if the object is a child of a model other
+        than a space, as it is inherited by all spaces in the model.
+        """
+        from modelx.core.space import UserSpace
+
+        parts = fullname.split(".")
+        if len(parts) == 2:
+            try:
+                obj = self._get_object(fullname)
+            except NameError:   # Removed
+                obj = None
+            if not isinstance(obj, UserSpace):
+                raise KeyError(fullname)
+
+        for i in range(2, len(parts)):
+            space = self._get_object(".".join(parts[:i]))
+            for sub in space.model._impl.spmgr._get_subs(space._impl):
+                yield ".".join([sub.fullname] + parts[i:])
+
+    def _publish_changes(self):
+        changes, self._mx_changes = self._mx_changes, None
+        if any(changes.values()):
+            self.send_mx_msg("mxchanged", content={
+                kind: sorted(names) for kind, names in changes.items()})
 
     def _define_var(self, obj, varname=None, replace_existing=True):
 
         name = varname or obj.name
-
-        if _spykern_ver > (2, 2):
-            glbs = self.shell.user_ns
-        else:
-            glbs = self._mglobals()
+        glbs = self._get_namespace()
 
         if replace_existing or name not in glbs:
             glbs[name] = obj
@@ -156,10 +737,24 @@ class ModelxKernel(SpyderKernel):
         else:
             return False
 
+    def _get_namespace(self):
+        if _spykern_ver > (2, 2):
+            return self.shell.user_ns
+        else:
+            return self._mglobals()
+
     @comm_handler
     def mx_import_names(self, fullname,
                         import_selected,
                         import_children, replace_existing):
+        """Define variables referring to the object and its children.
+
+        The names are collected first and defined in the namespace at once.
+        Returns a dict of "imported", "skipped" and "overwritten" lists
+        of names. Names skipped are the ones already defined and kept as
+        replace_existing is False, and names overwritten are the ones
+        already defined referring to other objects.
+        """
         import modelx as mx
         from modelx.core.space import ItemSpace
         if mx.VERSION > (0, 19):
@@ -169,34 +764,57 @@ class ModelxKernel(SpyderKernel):
         from modelx.core.space import BaseSpace
         from modelx.core.reference import ReferenceProxy
 
-        obj = mx.get_object(fullname, as_proxy=True)
+        obj = self._get_object(fullname, as_proxy=True)
+
+        # If not replace_existing, the first of the same names is
+        # defined, otherwise the last is.
+        names = {}
+        if replace_existing:
+            add = names.__setitem__
+        else:
+            add = names.setdefault
 
         if import_selected:  # Retrieve non item parent
             parent = obj
-            while isinstance(parent, mx.core.space.ItemSpace):
-                parent = obj.parent
+            while isinstance(parent, ItemSpace):
+                parent = parent.parent
 
             if isinstance(parent, ReferenceProxy):
-                self._define_var(parent.value,
-                                 varname=parent.name,
-                                 replace_existing=replace_existing)
+                add(parent.name, parent.value)
             else:
-                self._define_var(parent, replace_existing=replace_existing)
+                add(parent.name, parent)
 
         if import_children and isinstance(obj, BaseParent):
             for child in obj.spaces.values():
-                self._define_var(child, replace_existing=replace_existing)
+                add(child.name, child)
 
             if isinstance(obj, BaseSpace):
                 for child in obj.cells.values():
-                    self._define_var(child, replace_existing=replace_existing)
+                    add(child.name, child)
 
             for name, child in obj.refs.items():
-                self._define_var(child,
-                                 varname=name,
-                                 replace_existing=replace_existing)
+                add(name, child)
+
+        glbs = self._get_namespace()
+        existing = [name for name in names if name in glbs]
+        if replace_existing:
+            skipped = []
+            overwritten = [name for name in existing
+                           if glbs[name] is not names[name]]
+        else:
+            skipped = existing
+            overwritten = []
+            for name in skipped:
+                del names[name]
+
+        glbs.update(names)
 
         # self.send_mx_msg("mxupdated")
+        return {
+            "imported": list(names),
+            "skipped": skipped,
+            "overwritten": overwritten
+        }
 
     @comm_handler
     def mx_new_cells(self, model, parent, name, define_var, varname, formula):
@@ -212,11 +830,18 @@ class ModelxKernel(SpyderKernel):
             name: cells name or blank
             formula: function def or lambda expression blank
         """
+        import modelx as mx
+
+        new_model = not model and mx.cur_model() is None
         model = self._get_or_create_model(model)
+        new_space = False
         if parent:
             parent = model._get_from_name(parent)
+        elif model.cur_space():
+            parent = model.cur_space()
         else:
-            parent = model.cur_space() if model.cur_space() else model.new_space()
+            parent = model.new_space()
+            new_space = True
 
         if not name:
             name = None
@@ -231,13 +856,141 @@ class ModelxKernel(SpyderKernel):
         if define_var:
             self._define_var(cells, varname)
 
+        added = [cells.fullname]
+        if new_space:
+            added.insert(0, parent.fullname)
+        if new_model:
+            added.insert(0, model.fullname)
+        self._mx_changed(added=added)
+
 
     @comm_handler
-    def mx_set_formula(self, fullname, formula):
+    def mx_bulk_define(self, model, definitions):
+        """Create spaces and cells in one call.
+
+        definitions is a list of dicts with the following keys.
+
+            type: "space" or "cells"
+            parent: Named id of the parent, such as "Space1.Child1",
+                or blank for the model. Required for cells.
+            name: Name of the object, or blank to name it automatically
+            formula: Function def or lambda expression, or blank
+            bases: List of named ids of base spaces, for spaces only
+
+        Parents and bases defined in definitions are created before
+        the objects depending on them, and then the rest in the order
+        of definitions. Returns a dict of the following keys.
+
+            model: Fullname of the model
+            new_model: True if the model is created, as model is blank
+                and no current model exists
+            results: A list of dicts of "fullname" of the created object
+                and "error", the repr of the error raised, in the order
+                of definitions
+
+        Objects depending on failed ones, or in or depending on
+        circular dependencies, are not created. If the same object is
+        defined more than once, the definitions after the first fail,
+        and objects depending on it depend on the first definition.
+        """
         import modelx as mx
 
-        obj = mx.get_object(fullname)
+        new_model = not model and mx.cur_model() is None
+        model = self._get_or_create_model(model)
+
+        keys = {}
+        duplicates = {}     # Index -> named id defined earlier
+        for i, item in enumerate(definitions):
+            if item.get("name"):
+                parent = item.get("parent")
+                key = (parent + "." if parent else "") + item["name"]
+                if key in keys:
+                    duplicates[i] = key
+                else:
+                    keys[key] = i
+
+        # Indexes of definitions in dependency order by Kahn's algorithm
+        deps = []
+        dependents = [[] for _ in definitions]
+        for i, item in enumerate(definitions):
+            deps.append(set(
+                keys[d] for d in
+                [item.get("parent")] + list(item.get("bases") or [])
+                if d in keys))
+            for d in deps[i]:
+                dependents[d].append(i)
+
+        counts = [len(d) for d in deps]
+        ready = [i for i, n in enumerate(counts) if not n]
+        order = []
+        while ready:
+            i = heapq.heappop(ready)
+            order.append(i)
+            for j in dependents[i]:
+                counts[j] -= 1
+                if not counts[j]:
+                    heapq.heappush(ready, j)
+
+        report = [{"fullname": None,
+                   "error": "ValueError('circular dependency')"}
+                  for _ in definitions]
+        failed = set(range(len(definitions))) - set(order)
+        for i in order:
+            if i in duplicates:
+                failed.add(i)
+                report[i]["error"] = repr(ValueError(
+                    "duplicate definition: %s" % duplicates[i]))
+                continue
+            if deps[i] & failed:
+                failed.add(i)
+                report[i]["error"] = "ValueError('dependency not created')"
+                continue
+            item = definitions[i]
+            try:
+                obj = self._define_item(model, item)
+            except Exception as e:
+                failed.add(i)
+                report[i]["error"] = repr(e)
+            else:
+                report[i] = {"fullname": obj.fullname, "error": None}
+
+        added = [r["fullname"] for r in report if r["fullname"]]
+        if new_model:
+            added.insert(0, model.fullname)
+        self._mx_changed(added=added)
+
+        return {
+            "model": model.fullname,
+            "new_model": new_model,
+            "results": report
+        }
+
+    def _define_item(self, model, item):
+        parent = item.get("parent")
+        name = item.get("name") or None
+        formula = item.get("formula") or None
+
+        if item["type"] == "space":
+            parent = model._get_from_name(parent) if parent else model
+            bases = [model._get_from_name(b) for b in item.get("bases") or []]
+            return parent.new_space(
+                name=name, bases=bases or None, formula=formula)
+
+        elif item["type"] == "cells":
+            if not parent:
+                raise ValueError("parent not given for cells")
+            return model._get_from_name(parent).new_cells(
+                name=name, formula=formula)
+
+        else:
+            raise ValueError("invalid type: %s" % item["type"])
+
+    @comm_handler
+    def mx_set_formula(self, fullname, formula):
+        obj = self._get_object(fullname)
         obj.set_formula(formula)
+        self._mx_previews.invalidate(fullname)
+        self._mx_changed(changed=[fullname])
 
 
     def _get_or_create_model(self, model):
@@ -254,23 +1007,307 @@ class ModelxKernel(SpyderKernel):
 
 
     @comm_handler
-    def mx_get_attrdict(self, fullname=None, attrs=None, recursive=False):
-
+    def mx_get_attrdict(self, fullname=None, attrs=None, recursive=False,
+                        since=None, max_depth=None):
+        """Get attributes of a modelx object as cloudpickled bytes.
+
+        If since is None, returns the attrdict of the object.
+        If max_depth is given, children are expanded only up to
+        max_depth levels below the object regardless of recursive,
+        and views below are tuples of names.
+        If since is given, returns a dict for incremental update
+        of the tree of the object instead.
+        since is the token returned by the previous call, or 0 to get
+        the whole tree. The whole tree is also returned if since is not
+        valid, such as when the kernel has dropped the counters of
+        the tree. The returned dict has the following keys:
+
+            token: The token to pass as since to the next call
+            full: True if changed contains the whole tree
+            changed: A dict of tree paths to non-recursive attrdicts
+                of the objects added or changed after since
+            removed: A list of tree paths of the objects removed after since
+
+        A tree path is the fullname of the object prefixed with
+        the names of its parents in the tree, so it differs from the
+        fullname for references inherited from the model.
+        recursive is ignored when since is given.
+        """
         import modelx as mx
         if fullname is None:
             obj = mx.cur_model()
         else:
             try:
-                obj = mx.get_object(fullname, as_proxy=True)
+                obj = self._get_object(fullname, as_proxy=True)
             except NameError:
                 obj = None
 
-        if obj is not None:
+        if obj is None:
+            data = None
+        elif since is not None:
+            data = self._get_attrdict_delta(obj, attrs, since)
+        elif max_depth is not None:
+            data = self._get_attrdict_depth(obj, attrs, max_depth)
+        else:
             data = obj._get_attrdict(attrs, recursive=recursive)
+
+        return self._mx_encoder.dumps(data)
+
+    def _get_attrdict_delta(self, obj, attrs, since):
+
+        key = (obj.fullname, tuple(attrs) if attrs else None)
+        trees = self._mx_tree_versions
+        versions, walked = trees.pop(key, (None, None))
+        if versions is None:
+            versions = TreeVersions()
+        trees[key] = versions, self._mx_mutation_count
+        if len(trees) > _MAX_TREES:
+            trees.popitem(last=False)
+
+        # 0 if since is not issued by versions, such as one issued before
+        # the tree is dropped from trees, or by another kernel
+        since = versions.resolve(since)
+
+        # The attrdicts are kept in versions as signatures
+        if since == 0 or walked is None or walked < self._mx_mutated_all:
+            versions.update(self._walk_attrdicts(obj, attrs))
         else:
-            data = None
+            names = [name for name, count in self._mx_mutated.items()
+                     if count > walked]
+            if names:
+                versions.update(*self._walk_mutated(versions, names, attrs))
+
+        return {
+            "token": versions.issue(),
+            "full": since == 0,
+            "changed": {path: versions.signature(path)
+                        for path in versions.changed_since(since)},
+            "removed": versions.removed_since(since) if since else []
+        }
+
+    def _walk_mutated(self, versions, names, attrs):
+        """Get attrdicts of the subtrees of mutated objects in versions
+
+        Returns attrdicts by path and the list of the paths of
+        the subtrees walked. The subtree of the parent of a mutated
+        object is walked if the parent's attrdict is changed
+        other than by the mutated object, such as by clearing ItemSpaces.
+        """
+        names = set(names)
+        parents = {}
+        for name in names:
+            parent, _, childname = name.rpartition(".")
+            parents.setdefault(parent, []).append((childname, name))
+
+        attrdicts = {}
+        subtrees = {}
+        for path, data in list(versions.items()):
+            fullname = data["fullname"]
+            if fullname in names:
+                subtrees[path] = fullname
+            if fullname not in parents:
+                continue
+            try:
+                parent = self._get_object(fullname, as_proxy=True)
+            except NameError:   # Removed
+                continue
+            attrdicts[path] = parent._get_attrdict(attrs, recursive=False)
+            childnames = {childname for childname, _ in parents[fullname]}
+            if not same_signature(
+                    _without_names(data, childnames),
+                    _without_names(attrdicts[path], childnames)):
+                subtrees[path] = fullname
+            else:
+                for childname, name in parents[fullname]:
+                    subtrees[path + "." + childname] = name
+
+        walked = []
+        for path in sorted(subtrees):   # Parents come before children
+            if walked and (path + ".").startswith(walked[-1] + "."):
+                continue
+            walked.append(path)
+            try:
+                obj = self._get_object(subtrees[path], as_proxy=True)
+            except NameError:   # Removed
+                continue
+            attrdicts.update(self._walk_attrdicts(obj, attrs, path))
+
+        return attrdicts, walked
+
+    def _walk_attrdicts(self, obj, attrs=None, path=None):
+        """Get non-recursive attrdicts of obj and its descendants by path"""
+        result = {}
+        stack = [(path or obj.fullname, obj)]
+        while stack:
+            path, obj = stack.pop()
+            if path in result:
+                continue
+            data = result[path] = obj._get_attrdict(attrs, recursive=False)
+            for _, name, child in self._iter_children(obj, data):
+                childpath = path + "." + name
+                if childpath not in result:
+                    stack.append((childpath, child))
+
+        return result
+
+    def _get_attrdict_depth(self, obj, attrs, depth):
+        """Get attrdict of obj with children expanded up to depth levels
+
+        Expanded views are in the same form as _get_attrdict returns
+        when recursive is True, and views below depth are tuples of
+        names as _get_attrdict returns when recursive is False.
+        """
+        data = obj._get_attrdict(attrs, recursive=False)
+        if depth > 0:
+            for viewname in _CHILD_VIEWS:
+                if viewname not in data:
+                    continue
+                view = getattr(obj, viewname)
+                expanded = {"type": type(view).__name__}
+                expanded["items"] = {
+                    name: self._get_attrdict_depth(child, attrs, depth - 1)
+                    for name, child in self._iter_view(obj, viewname)
+                }
+                if viewname != "refs":
+                    expanded["keys"] = list(view.keys())
+                data[viewname] = expanded
+
+        return data
 
-        return cloudpickle.dumps(data)
+    def _iter_children(self, obj, attrdict):
+        """Yield (view name, name, child) in the order _get_attrdict recurses
+
+        attrdict is the non-recursive attrdict of obj, which tells
+        what views obj has. Children in spaces are skipped if obj
+        has named_spaces, as they are the same children.
+        """
+        for viewname in _CHILD_VIEWS:
+            if viewname not in attrdict:
+                continue
+            if viewname == "spaces" and "named_spaces" in attrdict:
+                continue
+            for name, child in self._iter_view(obj, viewname):
+                yield viewname, name, child
+
+    def _iter_view(self, obj, viewname):
+        from modelx.core.reference import ReferenceProxy
+
+        view = getattr(obj, viewname)
+        if viewname == "refs":
+            for name in view:
+                if name[0] != "_":
+                    yield name, ReferenceProxy(view._impls[name])
+        else:
+            yield from view.items()
+
+    @comm_handler
+    def mx_get_children(self, fullname, attrs=None, page=0, size=None,
+                        max_depth=0):
+        """Get attrdicts of children of a modelx object by page.
+
+        Children are ordered as _get_attrdict recurses, i.e.
+        spaces, ItemSpaces, cells and then references.
+        Returns a dict as cloudpickled bytes, whose "children" is a list of
+        (view name, name, attrdict) of the children on the page,
+        and "total" is the number of all the children.
+        If size is None, all the children are on page 0.
+        Each child's attrdict is expanded up to max_depth levels.
+        """
+        obj = self._get_object(fullname, as_proxy=True)
+        children = list(self._iter_children(
+            obj, obj._get_attrdict(recursive=False)))
+
+        if size is None:
+            paged = children if page == 0 else []
+        else:
+            paged = children[page * size:(page + 1) * size]
+
+        data = {
+            "total": len(children),
+            "page": page,
+            "size": size,
+            "children": [
+                (viewname, name,
+                 self._get_attrdict_depth(child, attrs, max_depth))
+                for viewname, name, child in paged]
+        }
+
+        return self._mx_encoder.dumps(data)
+
+    @comm_handler
+    def mx_batch(self, calls):
+        """Call multiple comm handlers in one round trip.
+
+        calls is a list of (handler name, args) or
+        (handler name, args, kwargs) passed as cloudpickled bytes.
+        Returns a list of (True, return value) or (False, error message),
+        one for each call in order, as cloudpickled bytes.
+        Return values are as returned by the handlers, so bytes returned
+        by handlers such as mx_get_node are kept cloudpickled.
+        An error in a call does not stop the subsequent calls.
+        """
+        calls = cloudpickle.loads(calls)
+
+        results = []
+        for call in calls:
+            name, args = call[0], call[1]
+            kwargs = call[2] if len(call) > 2 else {}
+            try:
+                handler = self._get_comm_handler(name)
+                results.append((True, handler(*args, **kwargs)))
+            except Exception as e:
+                results.append((False, "%s: %s" % (type(e).__name__, e)))
+
+        return self._mx_encoder.dumps(results)
+
+    def _get_comm_handler(self, name):
+        method = getattr(self, name, None)
+        if name == "mx_batch" or not hasattr(method, '_is_comm_handler'):
+            raise ValueError("no such comm handler: %s" % name)
+        return self._wrap_handler(name, method)
+
+    @comm_handler
+    def mx_negotiate_encoding(self, encodings, zlib_threshold=None):
+        """Set encodings of pickled data sent to the frontend.
+
+        encodings is a list of encodings the frontend accepts
+        in pickled bytes returned by handlers and sent by send_mx_msg,
+        out of the following. Returns a list of the accepted encodings.
+        See spymx_kernels.utility.serialize.WireEncoder for details.
+
+            pickle5: Pickle protocol 5
+            pickle: Standard pickle for data that cloudpickle is not needed
+            zlib: zlib compression of bytes longer than zlib_threshold
+
+        Without negotiation, handlers return bytes pickled by the default
+        protocol of cloudpickle, and send_mx_msg uses protocol 2.
+        """
+        if zlib_threshold is not None:
+            self._mx_encoder.zlib_threshold = zlib_threshold
+        return self._mx_encoder.negotiate(encodings)
+
+    @comm_handler
+    def mx_kernel_stats(self, reset=False):
+        """Get statistics of comm handler calls.
+
+        Returns a dict with "buckets", a list of the upper bounds in seconds
+        of latency histogram buckets, and "handlers", a dict of
+        handler names to dicts with the following keys.
+        Calls in mx_batch are counted under their own handler names
+        as well as mx_batch.
+
+            calls: The number of calls
+            errors: The number of calls that raised errors
+            total_time: Total seconds taken by the calls
+            max_time: The longest seconds taken by a call
+            histogram: Counts of calls by latency bucket,
+                with the last count for calls longer than the last bound
+            bytes: Total size of bytes returned
+            max_bytes: The largest size of bytes returned
+
+        The statistics are cleared after returned if reset is True.
+        """
+        return self._mx_stats.get(reset)
 
     @comm_handler
     def mx_get_modellist(self):
@@ -297,10 +1334,8 @@ class ModelxKernel(SpyderKernel):
 
     @comm_handler
     def mx_get_codelist(self, fullname):
-        import modelx as mx
-
         try:
-            obj = mx.get_object(fullname)
+            obj = self._get_object(fullname)
             data = obj._get_attrdict(['formula'])
         except:
             data = None
@@ -329,20 +1364,19 @@ class ModelxKernel(SpyderKernel):
 
     @comm_handler
     def mx_get_node(self, fullname: str, args):
-        import modelx as mx
         from modelx.core.reference import ReferenceProxy
         from modelx.core.base import Interface
 
         args = cloudpickle.loads(args)
 
         # args = ast.literal_eval(argstr)
-        obj = mx.get_object(fullname, as_proxy=True)
+        obj = self._get_object(fullname, as_proxy=True)
 
         node = obj.node(*args)
         data = node._get_attrdict(recursive=False, extattrs=['formula'])
-        data["value"] = value_to_display(data["value"])
+        self._preview_node_value(data)
 
-        return cloudpickle.dumps(data)
+        return self._mx_encoder.dumps(data)
 
     @comm_handler
     def mx_get_adjacent(self, obj: str,
@@ -353,19 +1387,18 @@ class ModelxKernel(SpyderKernel):
         which receives args as cloudpickled bytes. This method is kept
         for spyder-modelx 0.15.0 and earlier, which send args as json.
         """
-        import modelx as mx
         from modelx.core.base import Interface
 
         args = json.loads(jsonargs, object_hook=hinted_tuple_hook)
-        node = mx.get_object(obj).node(*args)
+        node = self._get_object(obj).node(*args)
         nodes = getattr(node, adjacency)
         attrs = [node._get_attrdict(
             recursive=False, extattrs=['formula']) for node in nodes]
 
         for node in attrs:
-            node["value"] = value_to_display(node["value"])
+            self._preview_node_value(node)
 
-        return cloudpickle.dumps(attrs)
+        return self._mx_encoder.dumps(attrs)
 
     @comm_handler
     def mx_adj_node(self, obj: str, args, adjacency: str):
@@ -375,81 +1408,452 @@ class ModelxKernel(SpyderKernel):
         cloudpickle instead of json, so that args needs no conversion,
         such as numpy numbers to Python builtins.
         """
-        import modelx as mx
         from modelx.core.base import Interface
 
         args = cloudpickle.loads(args)
-        node = mx.get_object(obj).node(*args)
+        node = self._get_object(obj).node(*args)
         nodes = getattr(node, adjacency)
         attrs = [node._get_attrdict(
             recursive=False, extattrs=['formula']) for node in nodes]
 
         for node in attrs:
-            node["value"] = value_to_display(node["value"])
+            self._preview_node_value(node)
 
-        return cloudpickle.dumps(attrs)
+        return self._mx_encoder.dumps(attrs)
 
     @comm_handler
-    def mx_get_value_info(self, model: str):
+    def mx_adj_graph(self, obj: str, args, adjacency: str,
+                     depth=1, max_nodes=None):
+        """Get the subgraph of nodes reachable from a node by adjacency.
+
+        Same as mx_adj_node except that adjacent nodes are followed up to
+        depth hops, or without limit if depth is None, until max_nodes
+        nodes are collected if max_nodes is given.
+        Returns a dict with the following keys as cloudpickled bytes:
+
+            nodes: A list of node attrdicts, the first of which is
+                the node of obj and args. Each node appears only once.
+            edges: A list of pairs of indexes into nodes,
+                (i, j) meaning nodes[j] is adjacent to nodes[i].
+            truncated: True if max_nodes stopped collecting nodes
+                before reaching all the nodes within depth.
+        """
+        args = cloudpickle.loads(args)
+        root = self._get_object(obj).node(*args)
+
+        index = {root: 0}
+        found = [root]
+        edges = []
+        truncated = False
+
+        level = [root]
+        hops = 0
+        while level and (depth is None or hops < depth):
+            nextlevel = []
+            for node in level:
+                for adj in getattr(node, adjacency):
+                    if adj not in index:
+                        if max_nodes is not None and len(found) >= max_nodes:
+                            truncated = True
+                            continue
+                        index[adj] = len(found)
+                        found.append(adj)
+                        nextlevel.append(adj)
+                    edges.append((index[node], index[adj]))
+            level = nextlevel
+            hops += 1
+
+        nodes = [node._get_attrdict(
+            recursive=False, extattrs=['formula']) for node in found]
+
+        for node in nodes:
+            self._preview_node_value(node)
+
+        return self._mx_encoder.dumps(
+            {"nodes": nodes, "edges": edges, "truncated": truncated})
+
+    def _preview_node_value(self, data):
+        """Replace value in node attrdict with its cached preview"""
+        data["value"] = self._mx_previews.get(
+            (data["obj"]["fullname"], data["args"]),
+            data["value"], value_to_display)
 
+    @comm_handler
+    def mx_memory_profile(self, fullname=None, sample=100):
+        """Get number and approximate size of cached values.
+
+        Returns a dict of "columns" and "rows", a table of the model or
+        space of fullname, or the current model if fullname is None,
+        and the spaces and cells in it. The table has no rows if
+        fullname is None and there is no current model. The columns are:
+
+            fullname: Full name of the object
+            type: Type name of the object
+            entries: Number of values cached in the object, or in its
+                descendants if the object is a model or space
+            size: Approximate size in bytes of the values and their args
+            itemspaces: Number of ItemSpaces below the object
+
+        ItemSpaces are not listed but counted in their parents.
+        Values are sized by spymx_kernels.utility.memsize.deep_sizeof,
+        sampling sample values of cells with more values.
+        """
         import modelx as mx
 
-        values = mx.get_models()[model]._get_assoc_values()
+        if fullname is None:
+            obj = mx.cur_model()
+        else:
+            obj = self._get_object(fullname)
 
-        i = 0
-        size = len(values)
+        rows = []
+        if obj is not None:
+            self._profile_memory(obj, sample, rows)
 
-        while i < size:
-            val = values[i]
+        return {
+            "columns": ["fullname", "type", "entries", "size", "itemspaces"],
+            "rows": rows
+        }
 
-            val["value"] = value_to_display(val["value"])
-            if val["spec"]:
-                val["spec"] = val["spec"]._get_attrdict()
-                if "value" in val["spec"]:
-                    val["spec"]["value"] = val["value"]
+    def _profile_memory(self, obj, sample, rows):
+        """Append rows of obj and its descendants to rows
 
-            val["refs"] = list(ref._get_attrdict() for ref in val["refs"])
-            i += 1
+        Returns entries, size and itemspaces of obj.
+        rows is None for ItemSpaces and their descendants.
+        """
+        row = None
+        if rows is not None:
+            row = [obj.fullname, type(obj).__name__]
+            rows.append(row)
+
+        if not hasattr(obj, "spaces"):     # Cells
+            data = obj._impl.data
+            total = [len(data), deep_sizeof(data, sample), 0]
+            if row is not None:
+                row.extend(total)
+            return total
+
+        total = [0, 0, 0]
+        if hasattr(obj, "named_spaces"):
+            spaces = obj.named_spaces
+        else:   # Model
+            spaces = obj.spaces
+        children = [(c, rows) for c in spaces.values()]
+        if hasattr(obj, "cells"):
+            children.extend((c, rows) for c in obj.cells.values())
+            items = list(obj._named_itemspaces.values())
+            children.extend((c, None) for c in items)
+            total[2] += len(items)
+
+        for child, child_rows in children:
+            for i, n in enumerate(
+                    self._profile_memory(child, sample, child_rows)):
+                total[i] += n
+
+        if row is not None:
+            row.extend(total)
+        return total
 
-        return values
+    @comm_handler
+    def mx_evict_values(self, budget, policy="largest", spaces=None,
+                        sample=100):
+        """Clear calculated values until their size is within budget.
+
+        The size of values cached in the models, or in the spaces or
+        cells of fullnames in spaces if given, is estimated as in
+        mx_memory_profile, and calculated values are cleared until
+        the estimated size is no more than budget bytes.
+        Input values are never cleared. policy is either of:
+
+            largest: Clear all calculated values of cells in descending
+                order of their size
+            oldest: Clear values in the order they are calculated.
+                As modelx does not record when values are calculated,
+                values are taken as older by their positions in the order
+                they are stored in each cells.
+
+        Clearing a value also clears the values depending on it.
+        Returns a dict of "before" and "after", the estimated sizes
+        before and after clearing, and "cleared", a list of pairs of
+        the fullname of each cells and the number of values cleared,
+        including the values cleared as dependents.
+        """
+        import modelx as mx
 
-    def _to_sendval(self, value):
-        import modelx
-        mxver = tuple(int(i) for i in modelx.__version__.split(".")[:3])
-        from modelx.core.cells import Interface
-
-        if mxver < (0, 18, 0):
-            from modelx.io.baseio import BaseDataClient as iospec
-        elif mxver < (0, 20, 0):
-            from modelx.io.baseio import BaseDataSpec as iospec
+        if policy not in ("largest", "oldest"):
+            raise ValueError("invalid policy: %s" % policy)
+
+        if spaces:
+            roots = [self._get_object(name) for name in spaces]
         else:
-            from modelx.io.baseio import BaseIOSpec as iospec
+            roots = list(mx.get_models().values())
+
+        cellslist = [cells for root in roots
+                     for cells in self._iter_cells(root)]
+        counts = [len(cells._impl.data) for cells in cellslist]
+        sizes = [deep_sizeof(cells._impl.data, sample) for cells in cellslist]
+        before = after = sum(sizes)
+
+        # Sizes are estimated, so values are cleared again
+        # until the size measured again is within budget
+        while after > budget:
+            calc_sizes = [
+                (cells, self._get_calc_size(cells, size, sample))
+                for cells, size in zip(cellslist, sizes)
+                if len(cells._impl.data) > len(cells._impl.input_keys)]
+            if not calc_sizes:  # Only input values left
+                break
+            excess = after - budget
+
+            if policy == "largest":
+                for cells, size in sorted(
+                        calc_sizes, key=lambda pair: pair[1], reverse=True):
+                    if excess <= 0:
+                        break
+                    cells.clear()
+                    excess -= size
+
+            else:   # oldest
+                values = heapq.merge(
+                    *(self._iter_old_values(cells, size)
+                      for cells, size in calc_sizes))
+                for _, size, _, cells, key in values:
+                    if excess <= 0:
+                        break
+                    if key in cells._impl.data and not cells.is_input(*key):
+                        cells.clear_at(*key)
+                        excess -= size
+
+            sizes = [deep_sizeof(cells._impl.data, sample)
+                     for cells in cellslist]
+            after = sum(sizes)
+
+        cleared = []
+        for cells, count in zip(cellslist, counts):
+            count -= len(cells._impl.data)
+            if count:
+                cleared.append((cells.fullname, count))
+                self._mx_previews.invalidate(cells.fullname)
+        self._mx_changed(changed=[name for name, _ in cleared])
+
+        return {
+            "before": before,
+            "after": after,
+            "cleared": cleared
+        }
+
+    def _get_calc_size(self, cells, size, sample):
+        """Estimate size of calculated values of cells
+
+        size is the estimated size of all the values of cells,
+        from which the size of input values is subtracted.
+        """
+        data = cells._impl.data
+        inputs = {key: data[key] for key in cells._impl.input_keys
+                  if key in data}
+        if inputs:
+            return max(size - deep_sizeof(inputs, sample), 0)
+        return size
+
+    def _iter_cells(self, obj):
+        """Yield cells in obj and its descendants including ItemSpaces"""
+        if not hasattr(obj, "spaces"):     # Cells
+            yield obj
+            return
+        elif hasattr(obj, "named_spaces"):
+            spaces = list(obj.named_spaces.values())
+            spaces.extend(obj._named_itemspaces.values())
+            yield from obj.cells.values()
+        else:   # Model
+            spaces = obj.spaces.values()
+
+        for space in spaces:
+            yield from self._iter_cells(space)
+
+    def _iter_old_values(self, cells, size):
+        """Yield calculated values of cells with their relative age and size
+
+        Yields tuples of the position of the value relative to the
+        number of the values, approximate size of the value, id of cells,
+        cells and the args of the value, in the order sortable by age.
+        size is the estimated size of the calculated values of cells.
+        """
+        inputs = cells._impl.input_keys
+        keys = [key for key in cells._impl.data if key not in inputs]
+        if keys:
+            value_size = size / len(keys)
+            for i, key in enumerate(keys):
+                yield i / len(keys), value_size, id(cells), cells, key
 
-        if isinstance(value, (Interface, str, iospec, ModuleType)):
-            return repr(value)
+    @comm_handler
+    def mx_start_profile(self, maxlen=DEFAULT_MAXLEN):
+        """Start recording formula calculations for mx_get_profile.
+
+        Stack trace of modelx is activated keeping maxlen records at most,
+        beyond which the oldest records are dropped, so only the latest
+        calculations are profiled. Calculations slow down while recording.
+        Returns False without changing maxlen if the stack trace is
+        already active, such as by another frontend.
+        """
+        import modelx as mx
+        try:
+            mx.get_stacktrace()
+        except RuntimeError:    # Not active
+            pass
+        else:
+            return False
 
-        elif any(
-                is_instance_of(value, c, "pandas") for c in [
-                    "DataFrame", "Index", "Series"
-                ]):
-            return "Type: " + value.__class__.__name__
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            mx.start_stacktrace(maxlen=maxlen)
+        return True
 
-        elif any(
-            is_instance_of(value, c, "numpy") for c in [
-                "ndarray", "MaskedArray"
-            ]):
-            return "Type: " + value.__class__.__name__
+    @comm_handler
+    def mx_get_profile(self, top=None, sort="self"):
+        """Get formula calculations recorded since mx_start_profile.
+
+        Returns a dict of "columns" and "rows", a table of
+        fullname, calls, cumulative and self seconds of each cells,
+        in descending order of sort, limited to top rows if given.
+        Values found in caches are not counted as calls, as
+        modelx does not record them.
+        See spymx_kernels.utility.formulaprofile.summarize_stacktrace.
+        """
+        import modelx as mx
+        rows = summarize_stacktrace(mx.get_stacktrace(), sort)
+        return {"columns": list(PROFILE_COLUMNS), "rows": rows[:top]}
+
+    @comm_handler
+    def mx_stop_profile(self, top=None, sort="self"):
+        """Stop recording and return the same table as mx_get_profile"""
+        import modelx as mx
+        try:
+            return self.mx_get_profile(top, sort)
+        finally:
+            with warnings.catch_warnings():    # Warned if not active
+                warnings.simplefilter("ignore")
+                mx.stop_stacktrace()
+
+    @comm_handler
+    def mx_preview_cache_stats(self, reset=False):
+        """Get hits, misses, entries, size and maxsize of preview cache.
+
+        Hit and miss counts are reset to 0 if reset is True.
+        """
+        return self._mx_previews.stats(reset)
 
-        elif isinstance(value, (list, set, tuple, dict)):
-            return "Type: " + value.__class__.__name__
+    @comm_handler
+    def mx_clear_preview_cache(self, fullname=None):
+        """Clear previews of fullname and its descendants, or all previews"""
+        self._mx_previews.invalidate(fullname)
 
-        elif is_numpy_number(value):
-            return numpy_to_py[type(value).__name__](value)
+    @comm_handler
+    def mx_get_value_info(self, model: str, offset=0, limit=None,
+                          spec_type=None, prefix=None, summary=False):
+        """Get values associated with model and their specs and refs.
+
+        Returns a list of dicts of "value", "spec" and "refs".
+        Values can be filtered and paged as follows, so that
+        only the returned values are converted for display.
+
+            spec_type: Only values whose spec is of the class named
+                spec_type, or values without specs if spec_type is ""
+            prefix: Only values referred to by refs whose names
+                start with prefix
+            offset, limit: Skip the first offset values filtered and
+                return at most limit values. Request limit + 1 values to
+                know if more values follow.
+            summary: If True, "value" is the type name of the value instead
+                of its display by value_to_display
+        """
+        import modelx as mx
+
+        model = mx.get_models()[model]
+        if limit is None:
+            stop = None
         else:
+            stop = offset + limit
+
+        values = []
+        count = 0
+        for value, spec in self._iter_assoc_values(model):
+            if stop is not None and count >= stop:
+                break
+
+            if spec_type is not None:
+                if spec is None:
+                    if spec_type:
+                        continue
+                elif type(spec).__name__ != spec_type:
+                    continue
+
+            refs = None
+            if prefix is not None:
+                refs = model._get_refs(value)
+                if not any(ref.name.startswith(prefix) for ref in refs):
+                    continue
+
+            count += 1
+            if count <= offset:
+                continue
+
+            if refs is None:
+                refs = model._get_refs(value)
+
+            if summary:
+                display = _type_string(value)
+            else:   # Not cached as references are often mutated in place
+                display = value_to_display(value)
+
+            if spec:
+                spec = spec._get_attrdict()
+                if "value" in spec:
+                    spec["value"] = display
+
+            values.append({
+                "value": display,
+                "spec": spec,
+                "refs": list(ref._get_attrdict() for ref in refs)
+            })
+
+        return values
+
+    def _iter_assoc_values(self, model):
+        """Yield pairs of values associated with model and their specs"""
+        try:
+            values = model._impl.valreg.values
+            iomanager = model._impl.system.iomanager
+            ios = iomanager.get_ios(model)
+            ios.update(iomanager.get_ios(None))
+        except AttributeError:
+            for val in model._get_assoc_values():
+                yield val["value"], val["spec"]
+            return
+
+        # Specs by their values looked up at once, instead of
+        # iomanager.get_spec_from_value searching all specs for each value
+        specs = {}
+        for io_ in ios.values():
+            for spec in io_.specs.values():
+                specs.setdefault(id(spec.value), spec)
+
+        for value in values:
+            yield value, specs.get(id(value))
+
+    def _to_sendval(self, value):
+        global _sendval_converter
+
+        if _sendval_converter is None:
+            _sendval_converter = _make_sendval_converter()
+
+        convert = _sendval_converter(value)
+        if convert is None:
             return value
+        else:
+            return convert(value)
 
     @comm_handler
-    def mx_get_value(self, fullname: str, argstr: str, calc: bool):
+    def mx_get_value(self, fullname: str, argstr: str, calc: bool,
+                     timeout=None):
         """Get value of modelx object
 
         Returns a pair of the value and bool to indicate if the value is just
@@ -461,28 +1865,17 @@ class ModelxKernel(SpyderKernel):
         method for that purpose. This method continues to serve
         MxDataViewer in later spyder-modelx versions, as its args are
         entered by the user as a literal string.
-        """
-        import modelx as mx
-        from modelx.core.reference import ReferenceProxy
-        from modelx.core.base import Interface
 
+        See mx_node_value for timeout.
+        """
         args = ast.literal_eval(argstr)
-        obj = mx.get_object(fullname, as_proxy=True)
-        if isinstance(obj, ReferenceProxy):
-            value = [mx.get_object(fullname), False]
-        elif isinstance(obj, Interface):
-            if args in obj:
-                value = [obj(*args), False]
-            else:
-                if calc:
-                    value = [obj(*args), True]
-                else:
-                    raise KeyError("value for %s not found" % argstr)
+        value = self._get_value_within(fullname, args, calc, argstr, timeout)
 
-        return cloudpickle.dumps(value)
+        return self._mx_encoder.dumps(value)
 
     @comm_handler
-    def mx_node_value(self, fullname: str, args, calc: bool):
+    def mx_node_value(self, fullname: str, args, calc: bool,
+                      timeout=None):
         """Get value of a modelx node with args passed as cloudpickled bytes.
 
         Same as mx_get_value except that args are serialized by
@@ -491,25 +1884,311 @@ class ModelxKernel(SpyderKernel):
 
         Returns a pair of the value and bool to indicate if the value is just
         calculated
+
+        If timeout is given and calc is True, the value is calculated
+        in a background job, and if the calculation does not finish in
+        timeout seconds, a dict of "status" set to "computing" and
+        "job", the job id, is returned instead of the pair.
+        The pair is then available through mx_poll_value, and
+        the calculation can be cancelled by mx_cancel_job.
+        Handlers touching modelx raise RuntimeError, and code run in the
+        console waits, until the job finishes.
         """
-        import modelx as mx
+        args = cloudpickle.loads(args)
+        value = self._get_value_within(
+            fullname, args, calc, repr(args), timeout)
+
+        return self._mx_encoder.dumps(value)
+
+    @comm_handler
+    def mx_calc_nodes(self, fullname: str, args_list, calc=True,
+                      chunk_size=None):
+        """Get values of a cells for many args in one call.
+
+        args_list is a cloudpickled list of args tuples.
+        Values are evaluated in the order of args_list, one after another
+        as modelx formulas are not thread-safe. Returns cloudpickled
+        columns of the results as a dict of:
+
+            values: List of the values, None for errors
+            calculated: List of bools to indicate if the values are
+                just calculated
+            errors: Dict of indexes in args_list to the reprs of
+                the errors raised. If calc is False, values not
+                calculated yet are KeyErrors.
+
+        If chunk_size is given, results are published by send_mx_msg
+        every chunk_size args as "mxcalcchunk" messages with
+        "handle" and "offset", the index of the first args of the chunk,
+        in the content, and the columns of the chunk as the data.
+        A dict of "handle" and "count", the number of args evaluated,
+        is returned instead of the columns.
+        """
+        args_list = cloudpickle.loads(args_list)
+        obj = self._get_object(fullname)
+
+        if chunk_size:
+            self._mx_stream_count += 1
+            handle = self._mx_stream_count
+            for offset in range(0, len(args_list), chunk_size):
+                columns = self._calc_columns(
+                    obj, args_list[offset:offset + chunk_size], calc, offset)
+                self.send_mx_msg("mxcalcchunk", content={
+                    "handle": handle,
+                    "offset": offset
+                }, data=columns)
+
+            return self._mx_encoder.dumps(
+                {"handle": handle, "count": len(args_list)})
+        else:
+            return self._mx_encoder.dumps(
+                self._calc_columns(obj, args_list, calc))
+
+    def _calc_columns(self, obj, args_list, calc, offset=0):
+        values = []
+        calculated = []
+        errors = {}
+        for i, args in enumerate(args_list, offset):
+            try:
+                if args in obj:
+                    value, is_calc = obj(*args), False
+                elif calc:
+                    value, is_calc = obj(*args), True
+                else:
+                    raise KeyError("value for %s not found" % repr(args))
+            except Exception as e:
+                value, is_calc = None, False
+                errors[i] = repr(e)
+            values.append(value)
+            calculated.append(is_calc)
+
+        if calc and (errors or any(calculated)):
+            self._mark_calculated()
+
+        return {"values": values, "calculated": calculated, "errors": errors}
+
+    @comm_handler
+    def mx_send_value(self, msgtype, fullname: str, args, calc: bool):
+        """Publish value of a modelx node with out-of-band buffers.
+
+        Same as mx_node_value, or mx_get_value if args is a literal
+        string, except that the pair is published by send_mx_msg
+        with oob set to True as a message of msgtype instead of
+        being returned, so that buffers of large arrays are sent
+        to the frontend without copying.
+        """
+        args, argsrepr = self._loads_args(args)
+        value = self._get_value(fullname, args, calc, argsrepr)
+        self.send_mx_msg(msgtype, data=value, oob=True)
+
+    @comm_handler
+    def mx_stream_value(self, fullname: str, args, calc: bool,
+                        threshold=2**24, chunk_size=2**20):
+        """Get value of a modelx node, streaming it in chunks if large.
+
+        args are either cloudpickled bytes or a literal string as
+        mx_send_value. The pair of the value and the bool is pickled by
+        spymx_kernels.utility.serialize.dumps_oob. If the pickled size
+        is not larger than threshold, returns a dict whose "handle" is None
+        and "value" is the list of the pickled buffers as bytes,
+        to be unpickled by spymx_kernels.utility.serialize.loads_oob,
+        so the pair is not pickled again.
+
+        Otherwise, returns a dict with the following keys,
+        and then publishes the pickled pair in chunks of chunk_size bytes
+        by send_mx_msg, one chunk per message.
+
+            handle: The stream handle
+            parts: A list of the sizes of the pickled buffers
+            nchunks: The number of chunks
+
+        Each chunk message is of type "mxstreamchunk" with content having
+        "handle", "seq", "part" and "offset" of the chunk, and the chunk
+        as its only buffer. After the last chunk, a message of type
+        "mxstreamend" is published with content having "handle",
+        "nchunks" and "crc32" of all the chunks.
+        Chunks are published from the event loop, so the stream
+        can be cancelled by mx_cancel_stream in the middle.
+        """
+        args, argsrepr = self._loads_args(args)
+        value = self._get_value(fullname, args, calc, argsrepr)
+        buffers = dumps_oob(value)
+
+        parts = [memoryview(buf).nbytes for buf in buffers]
+        if sum(parts) <= threshold:
+            return self._mx_encoder.dumps({
+                "handle": None,
+                "value": [bytes(buf) for buf in buffers]
+            })
+
+        self._mx_stream_count += 1
+        handle = self._mx_stream_count
+        self._mx_streams[handle] = {
+            "chunks": iter_chunks(buffers, chunk_size),
+            "seq": 0,
+            "crc32": 0
+        }
+        self.io_loop.add_callback(self._send_stream_chunk, handle)
+
+        return self._mx_encoder.dumps({
+            "handle": handle,
+            "parts": parts,
+            "nchunks": sum(-(-size // chunk_size) for size in parts)
+        })
+
+    @comm_handler
+    def mx_cancel_stream(self, handle):
+        """Stop streaming by mx_stream_value. Returns False if not streaming"""
+        return self._mx_streams.pop(handle, None) is not None
+
+    def _send_stream_chunk(self, handle):
+        stream = self._mx_streams.get(handle)
+        if stream is None:  # Cancelled
+            return
+
+        try:
+            part, offset, chunk = next(stream["chunks"])
+        except StopIteration:
+            del self._mx_streams[handle]
+            self.send_mx_msg("mxstreamend", content={
+                "handle": handle,
+                "nchunks": stream["seq"],
+                "crc32": stream["crc32"]
+            })
+            return
+
+        stream["crc32"] = zlib.crc32(chunk, stream["crc32"])
+        self.send_mx_msg("mxstreamchunk", content={
+            "handle": handle,
+            "seq": stream["seq"],
+            "part": part,
+            "offset": offset
+        }, buffers=[chunk])
+        stream["seq"] += 1
+        self.io_loop.add_callback(self._send_stream_chunk, handle)
+
+    def _loads_args(self, args):
+        """Get args and its repr from cloudpickled bytes or literal string"""
+        if isinstance(args, str):
+            return ast.literal_eval(args), args
+        else:
+            args = cloudpickle.loads(args)
+            return args, repr(args)
+
+    def _get_value_within(self, fullname, args, calc, argsrepr, timeout):
+        """_get_value calculating in a background job if timeout is given"""
+        if not calc or timeout is None:
+            return self._get_value(fullname, args, calc, argsrepr)
+
+        # Result of the last calculation not polled is discarded
+        if self._mx_calc_job is not None:
+            self._mx_jobs.pop(self._mx_calc_job.id, None)
+
+        jobid = self._start_job(
+            lambda job: self._eval_value_in_job(job, fullname, args, argsrepr),
+            on_done=self._on_calc_done,
+            stack_size=0x10000000)     # 256MB as modelx's formula thread
+
+        self._mx_calc_job = job = self._mx_jobs[jobid]
+        job.thread.join(timeout)
+        return self._get_job_value(job)
+
+    def _eval_value_in_job(self, job, fullname, args, argsrepr):
+        # Cancel the calculation at the next formula call
+        # by raising an error where modelx checks the depth of formula calls,
+        # so the values calculated so far are kept consistent.
+        callstack = self.get_modelx().executor.callstack
+        append = type(callstack).append
+
+        def check_and_append(item):
+            if job.cancelled:
+                raise JobCancelled()
+            append(callstack, item)
+
+        callstack.append = check_and_append
+        try:
+            return self._get_value(fullname, args, True, argsrepr)
+        finally:
+            del callstack.append
+
+    def _on_calc_done(self, job):
+        if job.cancelled:   # Result not wanted
+            job.result = None
+
+    def _get_job_value(self, job):
+        if not job.done:
+            return {"status": "computing", "job": job.id}
+
+        del self._mx_jobs[job.id]
+        if job is self._mx_calc_job:
+            self._mx_calc_job = None
+
+        if job.cancelled or isinstance(job.error, JobCancelled):
+            # Not raised as is, as comms only handle Exception
+            raise RuntimeError(
+                "calculation cancelled in background job %d" % job.id)
+        elif job.error is not None:
+            raise job.error
+        return job.result
+
+    def _check_jobs_idle(self):
+        job = self._mx_calc_job
+        if job is not None and not job.done:
+            raise RuntimeError(
+                "calculation in progress in background job %d" % job.id)
+
+        job = self._mx_io_job
+        if job is not None and not job.done:
+            raise RuntimeError(
+                "model reading or writing in progress in background job %d"
+                % job.id)
+
+    @comm_handler
+    def mx_poll_value(self, jobid, timeout=0):
+        """Get the value calculated in a job started by mx_node_value.
+
+        Waits for the calculation for timeout seconds at most, and returns
+        the same as mx_node_value. Errors raised in the calculation
+        are raised again, and RuntimeError is raised if the calculation
+        is cancelled. The result is kept until it is polled or
+        another calculation is started in background, and RuntimeError
+        is raised for jobs not kept.
+        """
+        job = self._mx_jobs.get(jobid)
+        if job is None or job is not self._mx_calc_job:
+            raise RuntimeError("no calculation in background job %d" % jobid)
+        if not job.done:
+            job.thread.join(timeout)
+        return self._mx_encoder.dumps(self._get_job_value(job))
+
+    def _get_value(self, fullname, args, calc, argsrepr):
         from modelx.core.reference import ReferenceProxy
         from modelx.core.base import Interface
 
-        args = cloudpickle.loads(args)
-        obj = mx.get_object(fullname, as_proxy=True)
+        obj = self._get_object(fullname, as_proxy=True)
         if isinstance(obj, ReferenceProxy):
-            value = [mx.get_object(fullname), False]
+            value = [self._get_object(fullname), False]
         elif isinstance(obj, Interface):
             if args in obj:
                 value = [obj(*args), False]
             else:
                 if calc:
-                    value = [obj(*args), True]
+                    try:
+                        value = [obj(*args), True]
+                    finally:
+                        self._mark_calculated()
                 else:
-                    raise KeyError("value for %s not found" % repr(args))
+                    raise KeyError("value for %s not found" % argsrepr)
 
-        return cloudpickle.dumps(value)
+        return value
+
+    def _mark_calculated(self):
+        """Mark objects mutated by formula calculations
+
+        Formulas can create ItemSpaces anywhere in models,
+        so all objects are marked, even if the calculation fails.
+        """
+        self._mark_all_mutated()
 
 
     @comm_handler
@@ -525,13 +2204,14 @@ class ModelxKernel(SpyderKernel):
         data = node._get_attrdict(recursive=False, extattrs=['formula'])
 
         if "value" in data:
-            data["value"] = value_to_display(data["value"])
+            self._preview_node_value(data)
 
         # () becomes [] without cloudpickling
-        return cloudpickle.dumps(data)
+        return self._mx_encoder.dumps(data)
 
 
-    def send_mx_msg(self, mx_msgtype, content=None, data=None):
+    def send_mx_msg(self, mx_msgtype, content=None, data=None, oob=False,
+                    buffers=None):
         """
         Publish custom messages to the Spyder frontend.
 
@@ -546,18 +2226,32 @@ class ModelxKernel(SpyderKernel):
             The (JSONable) content of the message
         data: any
             Any object that is serializable by cloudpickle (should be most
-            things). Will arrive as cloudpickled bytes in `.buffers[0]`.
+            things). Will arrive as cloudpickled bytes in `.buffers[0]`,
+            encoded as negotiated by mx_negotiate_encoding.
+        oob: bool
+            If True, data is pickled by
+            spymx_kernels.utility.serialize.dumps_oob and
+            arrives in `.buffers` with out-of-band buffers following
+            `.buffers[0]`. `content['oob']` is set to True.
+        buffers: list
+            If given, sent as `.buffers` as is, and data is ignored.
         """
-        import cloudpickle
         parent = self.get_parent(channel="shell")
 
         if content is None:
             content = {}
         content['mx_msgtype'] = mx_msgtype
+        if buffers is None:
+            if oob:
+                content['oob'] = True
+                buffers = dumps_oob(data)
+            else:
+                buffers = [self._mx_encoder.dumps(data, protocol=2)]
+
         self.session.send(
             self.iopub_socket,
             'modelx_msg',
             content=content,
-            buffers=[cloudpickle.dumps(data, protocol=2)],
+            buffers=buffers,
             parent=parent)
 
@@ -178,7 +178,7 @@ class ModelxKernel(SpyderKernel):
         if import_selected:  # Retrieve non item parent
             parent = obj
             while isinstance(parent, mx.core.space.ItemSpace):
-                parent = obj.parent
+                parent = parent.parent
 
             if isinstance(parent, ReferenceProxy):
                 self._define_var(parent.value,
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Pool of ModelxKernel processes started in advance
+
+KernelPool keeps a number of idle kernels, started by
+spymx_kernels.console with modules such as modelx imported in advance,
+each with its connection file named "kernel-*.json" in the pool directory.
+A frontend takes over a kernel by :func:`claim`, which renames
+the connection file to "claimed-*.json", and the pool starts another
+kernel in the background to keep its size.
+
+The pool can also run as a process::
+
+    python -m spymx_kernels.console.pool --size 3 --dir DIR
+
+Kernels in the pool inherit the environment variables of the pool,
+so settings given by Spyder through environment variables
+at the start of each console are not available to them.
+"""
+
+import argparse
+import glob
+import os
+import os.path as osp
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+IDLE_PREFIX = "kernel-"
+CLAIMED_PREFIX = "claimed-"
+OWN_PREFIX = "spymx-"
+RETIRED_PREFIX = "retired-"
+
+
+def claim(directory):
+    """Take over an idle kernel in the pool directory
+
+    Returns the path to the renamed connection file of the kernel,
+    or None if no idle kernel is available.
+    The file belongs to the caller once claimed, and the caller should
+    remove it after shutting down the kernel.
+    """
+    for path in sorted(glob.glob(osp.join(directory, IDLE_PREFIX + "*.json"))):
+        name = osp.basename(path)[len(IDLE_PREFIX):]
+        claimed = osp.join(directory, CLAIMED_PREFIX + name)
+        try:
+            os.rename(path, claimed)    # Atomic, so only one frontend wins
+        except OSError:
+            continue
+        return claimed
+
+    return None
+
+
+class KernelPool:
+    """Keep size idle kernels running in directory
+
+    Each kernel is started with its own connection file
+    named "spymx-*.json", and after the kernel replies to
+    a kernel info request, a copy of the file is put in directory as
+    "kernel-*.json" for frontends to claim.
+
+    Args:
+        size: Number of idle kernels to keep
+        directory: Directory for connection files. A temporary
+            directory is created if not given, and removed by
+            :meth:`shutdown` if no claimed files are left in it.
+        preimport: Modules imported by the kernels before they
+            become idle
+        python: Python executable to run the kernels
+        interval: Seconds between checks to refill the pool
+        timeout: Seconds to wait for a kernel to become ready
+    """
+
+    def __init__(self, size=2, directory=None, preimport=("modelx",),
+                 python=None, interval=1.0, timeout=60):
+        self.size = size
+        self._own_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="spymx-pool-")
+        self.preimport = preimport
+        self.python = python or sys.executable
+        self.interval = interval
+        self.timeout = timeout
+        self._kernels = {}  # Idle connection file -> (Popen, own file)
+        self._claimed = {}  # Claimed connection file -> Popen not exited
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the thread to keep the pool filled"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def acquire(self):
+        """Take over an idle kernel. See :func:`claim`"""
+        return claim(self.directory)
+
+    def refill(self):
+        """Start kernels until size kernels are idle"""
+        with self._lock:
+            for path, (proc, own) in list(self._kernels.items()):
+                if osp.exists(path):
+                    if proc.poll() is not None:     # Exited
+                        del self._kernels[path]
+                        self._remove(path, own)
+                    continue
+
+                del self._kernels[path]
+                self._remove(own)
+                claimed = self._claimed_path(path)
+                if osp.exists(claimed):
+                    self._claimed[claimed] = proc
+                else:
+                    # Removed without being claimed, or claimed and
+                    # removed after the kernel is shut down by its frontend.
+                    # The kernel is not reachable in either case.
+                    proc.kill()
+                    proc.wait()
+
+            # Reap claimed kernels shut down by frontends
+            self._claimed = {c: p for c, p in self._claimed.items()
+                             if p.poll() is None}
+            needed = self.size - len(self._kernels)
+
+        for _ in range(needed):
+            if self._stop.is_set():
+                break
+            self._start_kernel()
+
+    def shutdown(self):
+        """Stop refilling and kill idle kernels
+
+        Claimed kernels are left running for their frontends.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            for path, (proc, own) in self._kernels.items():
+                # Renamed first, so a kernel claimed at the same time
+                # is never killed. The rename fails if claimed.
+                name = osp.basename(path)[len(IDLE_PREFIX):]
+                retired = osp.join(self.directory, RETIRED_PREFIX + name)
+                try:
+                    os.rename(path, retired)
+                except OSError:     # Claimed
+                    self._claimed[self._claimed_path(path)] = proc
+                else:
+                    proc.kill()
+                    proc.wait()
+                    self._remove(retired)
+                self._remove(own)
+            self._kernels.clear()
+
+        if self._own_directory:
+            try:
+                os.rmdir(self.directory)
+            except OSError:     # Claimed files left
+                pass
+
+    def _run(self):
+        self.refill()
+        while not self._stop.wait(self.interval):
+            self.refill()
+
+    def _start_kernel(self):
+        from jupyter_client import BlockingKernelClient
+        from jupyter_client.connect import write_connection_file
+
+        name = uuid.uuid4().hex + ".json"
+        own = osp.join(self.directory, OWN_PREFIX + name)
+        write_connection_file(own)
+
+        env = os.environ.copy()
+        if self.preimport:
+            env["SPYMX_KERNELS_PREIMPORT"] = ",".join(self.preimport)
+
+        proc = subprocess.Popen(
+            [self.python, "-m", "spymx_kernels.console", "-f", own],
+            env=env)
+
+        client = BlockingKernelClient(connection_file=own)
+        client.load_connection_file()
+        client.start_channels()
+        try:
+            client.wait_for_ready(timeout=self.timeout)
+        except RuntimeError:
+            proc.kill()
+            proc.wait()
+            self._remove(own)
+            return
+        finally:
+            client.stop_channels()
+
+        path = osp.join(self.directory, IDLE_PREFIX + name)
+        with self._lock:
+            shutil.copyfile(own, path)
+            self._kernels[path] = (proc, own)
+
+    def _claimed_path(self, path):
+        """Get the claimed name of the idle connection file path"""
+        name = osp.basename(path)[len(IDLE_PREFIX):]
+        return osp.join(self.directory, CLAIMED_PREFIX + name)
+
+    def _remove(self, *paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep ModelxKernel processes ready for consoles")
+    parser.add_argument("--size", type=int, default=2,
+                        help="Number of idle kernels to keep")
+    parser.add_argument("--dir", default=None,
+                        help="Directory for connection files")
+    parser.add_argument("--preimport", default="modelx",
+                        help="Comma separated modules to import in advance")
+    args = parser.parse_args()
+
+    pool = KernelPool(
+        size=args.size,
+        directory=args.dir,
+        preimport=[m for m in args.preimport.split(",") if m])
+    pool.start()
+    print(pool.directory, flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
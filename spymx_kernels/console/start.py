@@ -15,6 +15,8 @@ import os
 import os.path as osp
 import sys
 import site
+import time
+from contextlib import contextmanager
 
 # Third-party imports
 from traitlets import DottedObjectName
@@ -41,6 +43,74 @@ except ImportError:
     SpyderKernelApp = None
 
 
+# List of (phase, seconds) taken by main() to start the kernel,
+# in the order of the phases. Read by ModelxKernel.mx_get_startup_timing.
+startup_timing = []
+
+
+@contextmanager
+def _timed(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timing.append((phase, time.perf_counter() - start))
+
+
+def mxprofile(line):
+    """
+    Profile formula calculations of modelx run by a statement
+
+    %mxprofile [-n TOP] [-l MAXLEN] statement
+
+    Prints calls, cumulative and self seconds of the formulas of each
+    cells, the TOP cells taking the longest self seconds (20 by default).
+    Values found in caches are not counted as calls.
+    At most MAXLEN records of formula calculations are kept
+    (spymx_kernels.utility.formulaprofile.DEFAULT_MAXLEN by default),
+    and only the latest ones are profiled beyond that.
+    """
+    import warnings
+    import modelx as mx
+    from IPython.core.getipython import get_ipython
+    from spymx_kernels.utility.formulaprofile import (
+        summarize_stacktrace, format_profile, records_since, DEFAULT_MAXLEN)
+
+    top = 20
+    maxlen = DEFAULT_MAXLEN
+    args = line.split(None, 2)
+    while args[:1] in (["-n"], ["-l"]):
+        if args[0] == "-n":
+            top = int(args[1])
+        else:
+            maxlen = int(args[1])
+        line = args[2] if len(args) > 2 else ""
+        args = line.split(None, 2)
+
+    # Keep stack trace active if started by others, such as
+    # ModelxKernel.mx_start_profile
+    try:
+        records = mx.get_stacktrace()
+        last = records[-1] if records else None
+        active = True
+    except RuntimeError:
+        last = None
+        active = False
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            mx.start_stacktrace(maxlen=maxlen)
+
+    try:
+        get_ipython().ex(line)
+    finally:
+        records = records_since(mx.get_stacktrace(), last)
+        if not active:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                mx.stop_stacktrace()
+
+    print(format_profile(summarize_stacktrace(records), top))
+
 
 def main():
     # Remove this module's path from sys.path:
@@ -57,7 +127,8 @@ def main():
     __name__ = '__main__'
 
     # Import our customizations into the kernel
-    import_spydercustomize()
+    with _timed("spydercustomize"):
+        import_spydercustomize()
 
     # Remove current directory from sys.path to prevent kernel
     # crashes when people name Python files or modules with
@@ -67,8 +138,9 @@ def main():
         sys.path.remove('')
 
     # Main imports
-    from ipykernel.kernelapp import IPKernelApp
-    from spymx_kernels.console.kernel import ModelxKernel
+    with _timed("imports"):
+        from ipykernel.kernelapp import IPKernelApp
+        from spymx_kernels.console.kernel import ModelxKernel
 
     if SpyderKernelApp is None:
         # Copied from spyder_kernels/console/start.py in spyder-kernels 3.0.5,
@@ -116,10 +188,13 @@ def main():
     if '' not in sys.path:
         sys.path.insert(0, '')
 
-    kernel.initialize()
+    with _timed("initialize"):
+        kernel.initialize()
 
     # Set our own magics
-    kernel.shell.register_magic_function(varexp)
+    with _timed("magics"):
+        kernel.shell.register_magic_function(varexp)
+        kernel.shell.register_magic_function(mxprofile)
 
     # Set Pdb class to be used by %debug and %pdb.
     # This makes IPython consoles to use the class defined in our
@@ -127,6 +202,15 @@ def main():
     import pdb
     kernel.shell.InteractiveTB.debugger_cls = pdb.Pdb
 
+    # Import modules such as modelx before the kernel becomes ready,
+    # for kernels started in advance by spymx_kernels.console.pool
+    preimport = os.environ.get("SPYMX_KERNELS_PREIMPORT")
+    if preimport:
+        import importlib
+        with _timed("preimport"):
+            for name in preimport.split(","):
+                importlib.import_module(name.strip())
+
     # Start the (infinite) kernel event loop.
     kernel.start()
 
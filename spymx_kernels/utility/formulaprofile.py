@@ -0,0 +1,101 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+
+PROFILE_COLUMNS = ("fullname", "calls", "cumulative", "self")
+
+# Records kept in modelx stack trace while profiling. The oldest records
+# are dropped beyond this, so memory does not grow while profiling is left
+# on, and only the latest calculations are profiled.
+DEFAULT_MAXLEN = 100000
+
+
+def summarize_stacktrace(records, sort="self"):
+    """Aggregate records of modelx stack trace by cells
+
+    records is a list returned by modelx.get_stacktrace.
+    Returns a list of rows of :data:`PROFILE_COLUMNS` in descending
+    order of the column sort, where calls is the number of formula
+    calculations, cumulative is the seconds taken by the calculations
+    including the formulas they call, counted once for recursive calls,
+    and self is the seconds excluding the formulas they call.
+    Values found in caches are not recorded in stack traces,
+    so they are not counted. Records not paired, such as ones of
+    calculations in progress or rolled back by errors, are ignored.
+    """
+    stats = {}      # fullname -> [calls, cumulative, self]
+    stack = []      # [depth, fullname, start, seconds in callees]
+    active = {}     # fullname -> number of calculations in stack
+
+    for kind, depth, time_, name, _ in records:
+        name = name.split("(", 1)[0]
+
+        # modelx records no EXIT of calculations rolled back by errors,
+        # so frames as deep as the record or deeper are left by them,
+        # except the frame of the EXIT record itself.
+        while stack and (stack[-1][0] > depth or (
+                stack[-1][0] == depth and kind == "ENTER")):
+            active[stack.pop()[1]] -= 1
+
+        if kind == "ENTER":
+            stack.append([depth, name, time_, 0.0])
+            active[name] = active.get(name, 0) + 1
+
+        elif stack and stack[-1][0] == depth and stack[-1][1] == name:
+            _, _, start, callees = stack.pop()
+            active[name] -= 1
+            elapsed = time_ - start
+
+            stat = stats.get(name)
+            if stat is None:
+                stat = stats[name] = [0, 0.0, 0.0]
+            stat[0] += 1
+            if not active[name]:
+                stat[1] += elapsed
+            stat[2] += elapsed - callees
+
+            if stack:
+                stack[-1][3] += elapsed
+
+    rows = [[name] + stat for name, stat in stats.items()]
+    rows.sort(key=lambda row: row[PROFILE_COLUMNS.index(sort)], reverse=True)
+    return rows
+
+
+def records_since(records, last):
+    """Get records after last in records
+
+    last is the last record of a stack trace taken before. The oldest
+    records of a stack trace are dropped when it is full, so the position
+    of last is searched for instead of using the length taken before.
+    If last is None or dropped, all records are returned.
+    """
+    if last is not None:
+        for i in range(len(records) - 1, -1, -1):
+            # Compared without args, whose == may not return a bool
+            if records[i][:4] == last[:4]:
+                return records[i + 1:]
+
+    return records
+
+
+def format_profile(rows, top=None):
+    """Format rows returned by :func:`summarize_stacktrace` as a table"""
+    lines = ["%10s %12s %12s  %s" % ("calls", "cumulative", "self",
+                                     "fullname")]
+    for name, calls, cumulative, self_ in rows[:top]:
+        lines.append("%10d %12.6f %12.6f  %s" % (
+            calls, cumulative, self_, name))
+
+    return "\n".join(lines)
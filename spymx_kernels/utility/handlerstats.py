@@ -0,0 +1,90 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+# Upper bounds of latency histogram buckets in seconds.
+# The last bucket of histograms counts calls longer than the last bound.
+LATENCY_BUCKETS = (0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1, 3, 10)
+
+
+class HandlerStats:
+    """Statistics of calls to comm handlers
+
+    Functions wrapped by :meth:`wrap` record, for each handler name,
+    the number of calls and errors, the latency histogram
+    and the total size of returned payloads.
+    Only bytes returned, such as cloudpickled data, are counted
+    as payloads, as other return values are serialized
+    by the comm after the handler returns.
+    """
+
+    def __init__(self):
+        self._stats = {}
+
+    def wrap(self, name, func):
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                self._record(name, perf_counter() - start, None, True)
+                raise
+            self._record(name, perf_counter() - start, result, False)
+            return result
+
+        return wrapper
+
+    def _record(self, name, elapsed, result, error):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = {
+                "calls": 0,
+                "errors": 0,
+                "total_time": 0.0,
+                "max_time": 0.0,
+                "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+                "bytes": 0,
+                "max_bytes": 0
+            }
+
+        stats["calls"] += 1
+        stats["total_time"] += elapsed
+        if elapsed > stats["max_time"]:
+            stats["max_time"] = elapsed
+        stats["histogram"][bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+        if error:
+            stats["errors"] += 1
+        elif isinstance(result, bytes):
+            size = len(result)
+            stats["bytes"] += size
+            if size > stats["max_bytes"]:
+                stats["max_bytes"] = size
+
+    def get(self, reset=False):
+        """Return a dict of latency buckets and statistics by handler name"""
+        result = {
+            "buckets": list(LATENCY_BUCKETS),
+            "handlers": {name: dict(stats, histogram=list(stats["histogram"]))
+                         for name, stats in self._stats.items()}
+        }
+        if reset:
+            self._stats.clear()
+
+        return result
@@ -0,0 +1,116 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Background jobs run in threads
+
+Jobs given on_open watch files opened in their threads through
+an audit hook, which is added by the first such job started. Audit hooks cannot
+be removed, so the hook stays for the life of the process and is
+called on every audited event in every thread, such as imports,
+file opens and socket calls. The hook returns immediately
+unless a job is running, which adds a function call to each event.
+"""
+
+import sys
+import threading
+
+# Callbacks on file open by thread id
+_open_callbacks = {}
+_audit_hook_added = False
+
+
+def _audit_hook(event, args):
+    # Called on every audited event, so whether jobs are running
+    # is checked first
+    if _open_callbacks and event == "open":
+        callback = _open_callbacks.get(threading.get_ident())
+        if callback is not None:
+            callback(args[0], args[1])
+
+
+class JobCancelled(BaseException):
+    """Raised in the thread of a job cancelled by :meth:`Job.cancel`
+
+    Derived from BaseException as KeyboardInterrupt, so that
+    ``except Exception`` clauses in the code run by the job,
+    such as in formulas, do not stop the cancellation.
+    """
+
+
+class Job:
+    """Function run in a background thread
+
+    func is called with the job as its only argument, and its return
+    value is set to :attr:`result`, or the error it raised to
+    :attr:`error`. on_open is called with the job, and the path
+    and mode of each file opened in the thread, and on_done is called
+    with the job when func finishes. Both are called in the thread.
+
+    :meth:`cancel` only sets :attr:`cancelled`. A job given on_open
+    is stopped by :class:`JobCancelled` raised on the next file open
+    in the thread, or func can check :attr:`cancelled` to stop itself.
+    Watching file opens requires Python 3.8 or newer.
+    """
+
+    def __init__(self, func, on_open=None, on_done=None, stack_size=None):
+        self.func = func
+        self.on_open = on_open
+        self.on_done = on_done
+        self.stack_size = stack_size
+        self.cancelled = False
+        self.done = False
+        self.result = None
+        self.error = None
+        self.thread = None
+        self.id = None
+
+    def start(self):
+        global _audit_hook_added
+
+        if (self.on_open is not None and not _audit_hook_added
+                and hasattr(sys, "addaudithook")):
+            sys.addaudithook(_audit_hook)
+            _audit_hook_added = True
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        if self.stack_size:
+            last_size = threading.stack_size(self.stack_size)
+            try:
+                self.thread.start()
+            finally:
+                threading.stack_size(last_size)
+        else:
+            self.thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _on_open(self, path, mode):
+        if self.cancelled:
+            raise JobCancelled()
+        self.on_open(self, path, mode)
+
+    def _run(self):
+        ident = threading.get_ident()
+        if self.on_open is not None:
+            _open_callbacks[ident] = self._on_open
+        try:
+            self.result = self.func(self)
+        except BaseException as e:
+            self.error = e
+        finally:
+            _open_callbacks.pop(ident, None)
+            self.done = True
+            if self.on_done is not None:
+                self.on_done(self)
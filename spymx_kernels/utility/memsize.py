@@ -0,0 +1,85 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from itertools import islice
+
+from spymx_kernels.utility.typeutil import TypeDispatcher
+
+
+def _classify(type_):
+    module = type_.__module__.split(".")[0]
+    if module == "numpy" and hasattr(type_, "nbytes"):
+        return "numpy"
+    elif module == "pandas" and hasattr(type_, "memory_usage"):
+        return "pandas"
+    elif issubclass(type_, dict):
+        return "dict"
+    elif issubclass(type_, (list, tuple, set, frozenset)):
+        return "collection"
+    else:
+        return None
+
+
+_get_kind = TypeDispatcher(_classify)
+
+
+def deep_sizeof(obj, sample=100, depth=4):
+    """Approximate size of obj and the objects it contains in bytes
+
+    Elements of dicts, lists, tuples and sets are sized
+    recursively up to depth levels. For containers longer than sample,
+    sample elements evenly spaced are sized and the total is
+    extrapolated. Numpy arrays are sized by their data, and pandas
+    objects by memory_usage without introspecting object columns.
+    Other objects are sized by sys.getsizeof, without the objects
+    they refer to. Objects referred to multiple times are counted
+    each time except in cycles.
+    """
+    return _sizeof(obj, sample, depth, set())
+
+
+def _sizeof(obj, sample, depth, seen):
+    kind = _get_kind(obj)
+
+    if kind is None:
+        return sys.getsizeof(obj)
+
+    elif kind == "numpy":
+        return max(sys.getsizeof(obj), obj.nbytes)
+
+    elif kind == "pandas":
+        size = obj.memory_usage()
+        if hasattr(size, "sum"):    # Series of columns of DataFrame
+            size = size.sum()
+        return int(size)
+
+    size = sys.getsizeof(obj)
+    if depth <= 0 or not obj or id(obj) in seen:
+        return size
+
+    seen.add(id(obj))
+    n = len(obj)
+    step = max(1, n // sample)
+    if kind == "dict":
+        items = islice(obj.items(), 0, None, step)
+        sizes = [_sizeof(k, sample, depth - 1, seen)
+                 + _sizeof(v, sample, depth - 1, seen) for k, v in items]
+    else:
+        items = islice(obj, 0, None, step)
+        sizes = [_sizeof(e, sample, depth - 1, seen) for e in items]
+    seen.discard(id(obj))
+
+    return size + sum(sizes) * n // len(sizes)
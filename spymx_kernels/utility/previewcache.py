@@ -0,0 +1,113 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import weakref
+from collections import OrderedDict
+
+from spymx_kernels.utility.memsize import deep_sizeof
+
+
+class PreviewCache:
+    """LRU cache of value previews bounded by the size of the previews
+
+    Previews are keyed by (fullname, args) of nodes. Each entry
+    refers to the value it was made from, weakly if the value
+    supports weak references, and an entry is used only when the node
+    still has the same value object, so previews of values
+    cleared or recalculated by modelx are never returned.
+    Values not supporting weak references, such as dicts, lists and
+    tuples, are kept by the entries, so their estimated sizes
+    are counted in the size of the previews. They are cached like
+    other values, as nested containers are the main previews worth
+    caching.
+    The cache cannot detect values changed in place, such as
+    mutable containers, DataFrames and ndarrays, so the owner must
+    invalidate entries whenever values may have been mutated,
+    e.g. after any code is run in the console.
+    Least recently used entries are evicted when the total
+    size of previews exceeds maxsize bytes.
+    """
+
+    def __init__(self, maxsize=2**26):
+        self.maxsize = maxsize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value ref, preview, size)
+
+    def get(self, key, value, func):
+        """Return preview of value by func, cached by key"""
+        if value is None:
+            return func(value)
+
+        try:
+            entry = self._entries.get(key)
+        except TypeError:   # Unhashable args
+            return func(value)
+
+        if entry is not None and entry[0]() is value:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        preview = func(value)
+        self._put(key, value, preview)
+        return preview
+
+    def _put(self, key, value, preview):
+        if key in self._entries:
+            self._remove(key)
+
+        size = sys.getsizeof(preview)
+        try:
+            ref = weakref.ref(value)
+        except TypeError:
+            ref = lambda: value
+            size += deep_sizeof(value)
+
+        self._entries[key] = (ref, preview, size)
+        self.size += size
+
+        while self.size > self.maxsize and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        self.size -= self._entries.pop(key)[2]
+
+    def invalidate(self, fullname=None):
+        """Remove entries of fullname and its descendants, or all entries"""
+        if fullname is None:
+            self._entries.clear()
+            self.size = 0
+        else:
+            prefix = fullname + "."
+            for key in [k for k in self._entries
+                        if k[0] == fullname or k[0].startswith(prefix)]:
+                self._remove(key)
+
+    def stats(self, reset=False):
+        """Return a dict of hits, misses, entries, size and maxsize"""
+        result = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "size": self.size,
+            "maxsize": self.maxsize
+        }
+        if reset:
+            self.hits = self.misses = 0
+
+        return result
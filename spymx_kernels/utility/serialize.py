@@ -0,0 +1,129 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import zlib
+
+import cloudpickle
+
+# Encodings of pickled bytes the frontend can declare to accept
+ENCODINGS = ("pickle5", "pickle", "zlib")
+
+
+def dumps_oob(obj):
+    """Pickle obj taking out buffers out of band
+
+    Returns a list whose first element is the pickled bytes of obj
+    and the rest are memoryviews of the buffers taken out of band.
+    Objects supporting pickle protocol 5, such as contiguous
+    numpy arrays and pandas DataFrames, hand their buffers to
+    the list without copying. The buffers refer to the memory of
+    obj, so obj must not be modified until the buffers are sent.
+
+    If pickle protocol 5 is not available, the list only has
+    the pickled bytes.
+    """
+    if pickle.HIGHEST_PROTOCOL < 5:
+        return [cloudpickle.dumps(obj)]
+
+    buffers = []
+    data = cloudpickle.dumps(
+        obj, protocol=5, buffer_callback=buffers.append)
+
+    return [data] + [buf.raw() for buf in buffers]
+
+
+def loads_oob(buffers):
+    """Unpickle buffers returned by :func:`dumps_oob`"""
+    if len(buffers) > 1:
+        return pickle.loads(buffers[0], buffers=buffers[1:])
+    else:
+        return pickle.loads(buffers[0])
+
+
+def iter_chunks(buffers, chunk_size):
+    """Yield (part, offset, chunk) slicing buffers into chunks
+
+    part is the index of the buffer in buffers, and offset is
+    the position of chunk in the buffer. chunk is a memoryview
+    of the buffer, so no data is copied.
+    """
+    for part, buf in enumerate(buffers):
+        view = memoryview(buf).cast("B")
+        for offset in range(0, len(view), chunk_size):
+            yield part, offset, view[offset:offset + chunk_size]
+
+
+class WireEncoder:
+    """Pickle data to send in encodings negotiated with the frontend
+
+    Without encodings, :meth:`dumps` is the same as cloudpickle.dumps.
+    The encodings the frontend accepts change :meth:`dumps` as follows.
+
+        pickle5: Pickle protocol 5 is used instead of the protocol given.
+        pickle: The standard pickle is tried first, and cloudpickle is
+            used only when pickle fails or the result refers
+            to __main__, which the frontend cannot import. Data that only
+            contains builtin types is pickled faster.
+        zlib: Pickled bytes longer than zlib_threshold are compressed.
+            Compressed bytes start with 0x78 while
+            pickled bytes start with 0x80, so :func:`loads_wire`
+            tells them apart.
+    """
+
+    def __init__(self, zlib_threshold=2**16, zlib_level=1):
+        self.encodings = frozenset()
+        self.zlib_threshold = zlib_threshold
+        self.zlib_level = zlib_level
+
+    def negotiate(self, encodings):
+        """Accept encodings and return a list of the accepted ones"""
+        accepted = set(encodings) & set(ENCODINGS)
+        if pickle.HIGHEST_PROTOCOL < 5:
+            accepted.discard("pickle5")
+        self.encodings = frozenset(accepted)
+
+        return [e for e in ENCODINGS if e in accepted]
+
+    def dumps(self, obj, protocol=None):
+        encodings = self.encodings
+        if "pickle5" in encodings:
+            protocol = 5
+        elif protocol is None:
+            protocol = cloudpickle.DEFAULT_PROTOCOL
+
+        data = None
+        if "pickle" in encodings:
+            try:
+                data = pickle.dumps(obj, protocol)
+            except Exception:
+                pass
+            else:
+                if b"__main__" in data:
+                    data = None
+
+        if data is None:
+            data = cloudpickle.dumps(obj, protocol)
+
+        if "zlib" in encodings and len(data) > self.zlib_threshold:
+            data = zlib.compress(data, self.zlib_level)
+
+        return data
+
+
+def loads_wire(data):
+    """Unpickle bytes returned by :meth:`WireEncoder.dumps`"""
+    if data[:1] == b"\x78":
+        data = zlib.decompress(data)
+    return pickle.loads(data)
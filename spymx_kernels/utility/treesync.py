@@ -0,0 +1,130 @@
+# Copyright (c) 2018-2025 Fumito Hamamura <fumito.ham@gmail.com>
+
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation version 3.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import uuid
+
+# Epochs are unique in the kernel process, and prefixed with an id of the
+# process so that tokens issued by other kernels are not taken as issued.
+_PROCESS_ID = uuid.uuid4().hex[:8]
+_epochs = itertools.count(1)
+
+
+class TreeVersions:
+    """Per-object change counters of a model tree
+
+    Keeps a signature and a version for each object in a tree,
+    keyed by the object's path in the tree.
+    :meth:`update` takes the signatures of the whole tree or of
+    some subtrees and bumps :attr:`token` if any object is added,
+    changed or removed.
+    The version of an added or changed object is set to the new token,
+    so that objects changed since a token given by the frontend
+    are the ones whose versions are greater than the token.
+    Signatures are compared by equality, and signatures failing
+    to compare are taken as changed.
+
+    Tokens given to the frontend are made by :meth:`issue` with
+    :attr:`epoch` unique to the instance, so that tokens issued by
+    a dropped tree are not taken as ones of a new tree
+    with the same path, whose counters restart.
+    """
+
+    def __init__(self):
+        self.epoch = "%s-%d" % (_PROCESS_ID, next(_epochs))
+        self.token = 0
+        self._versions = {}     # path -> [signature, version]
+        self._removed = {}      # path -> version
+
+    def update(self, signatures, subtrees=None):
+        """Update versions by signatures, a dict of path to signature
+
+        If subtrees is None, signatures are of the whole tree.
+        Otherwise, subtrees is a list of the paths of the subtrees
+        whose signatures are all in signatures, and objects outside them
+        are left as they are except the ones in signatures.
+        """
+        versions = self._versions
+
+        changed = [path for path, sig in signatures.items()
+                   if path not in versions
+                   or not same_signature(versions[path][0], sig)]
+
+        if subtrees is None:
+            removed = [path for path in versions if path not in signatures]
+        else:
+            prefixes = tuple(path + "." for path in subtrees)
+            subtrees = set(subtrees)
+            removed = [path for path in versions
+                       if path not in signatures
+                       and (path in subtrees or path.startswith(prefixes))]
+
+        if changed or removed:
+            self.token += 1
+
+        for path in changed:
+            versions[path] = [signatures[path], self.token]
+            self._removed.pop(path, None)
+
+        for path in removed:
+            del versions[path]
+            self._removed[path] = self.token
+
+    def issue(self):
+        """Return the current token to give to the frontend"""
+        return (self.epoch, self.token)
+
+    def resolve(self, token):
+        """Return the counter of token made by :meth:`issue`
+
+        Returns 0 if token is not issued by this instance, so that
+        the frontend gets the whole tree again.
+        """
+        try:
+            epoch, count = token
+        except (TypeError, ValueError):
+            return 0
+
+        if epoch != self.epoch or not isinstance(count, int):
+            return 0
+        elif not 0 <= count <= self.token:
+            return 0
+        else:
+            return count
+
+    def signature(self, path):
+        """Return the signature of the object at path"""
+        return self._versions[path][0]
+
+    def items(self):
+        """Iterate over pairs of path and signature"""
+        for path, (sig, _) in self._versions.items():
+            yield path, sig
+
+    def changed_since(self, token):
+        """Return paths added or changed after token"""
+        return [path for path, (_, ver) in self._versions.items()
+                if ver > token]
+
+    def removed_since(self, token):
+        """Return paths removed after token"""
+        return [path for path, ver in self._removed.items() if ver > token]
+
+
+def same_signature(x, y):
+    """Return True if signatures x and y are equal"""
+    try:
+        return bool(x == y)
+    except Exception:   # Such as arrays compared element-wise
+        return False
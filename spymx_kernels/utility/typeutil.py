@@ -12,6 +12,7 @@
 # You should have received a copy of the GNU Lesser General Public
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
+import weakref
 
 
 def is_instance_of(obj, class_: str, module: str):
@@ -28,7 +29,32 @@ def is_class_of(type_, class_: str, module: str):
     return False
 
 
-_numpy_number_types = [
+class TypeDispatcher:
+    """Memoize a decision made on the type of values
+
+    classify is called with the type of a value only when a value of
+    the type is first given, and its result is kept in a dict keyed
+    by the type, so that later values of the same type cost
+    a single dict lookup. classify must decide by the type alone.
+    The dict refers to the types weakly, so that classes redefined
+    or created dynamically can be freed, and the results of classify
+    must not refer to the types.
+    """
+
+    def __init__(self, classify):
+        self.classify = classify
+        self.table = weakref.WeakKeyDictionary()
+
+    def __call__(self, value):
+        type_ = type(value)
+        try:
+            return self.table[type_]
+        except KeyError:
+            result = self.table[type_] = self.classify(type_)
+            return result
+
+
+_numpy_number_types = {
     "bool_",
     "int_",
     "intc",
@@ -48,7 +74,7 @@ _numpy_number_types = [
     "complex_",
     "complex64",
     "complex128"
-]
+}
 
 numpy_to_py = {
     "bool_": bool,
@@ -96,12 +122,13 @@ def is_numpy_number(obj):
         complex128  subclass of Python complex
 
     """
-    type_ = type(obj)
-    type_name = type_.__name__
-    type_module = type_.__module__.split(".")[0]
+    return is_numpy_number_type(type(obj))
+
 
-    if type_module == "numpy":
-        if type_name in _numpy_number_types:
+def is_numpy_number_type(type_):
+    """Check if numpy number type. See is_numpy_number"""
+    if type_.__name__ in _numpy_number_types:
+        if type_.__module__.partition(".")[0] == "numpy":
             return True
 
     return False
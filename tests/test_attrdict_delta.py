@@ -0,0 +1,43 @@
+import pytest
+
+mx = pytest.importorskip("modelx")
+pytest.importorskip("spyder_kernels")
+
+from spymx_kernels.console import kernel as kernel_module
+from spymx_kernels.utility.serialize import loads_wire
+
+
+@pytest.fixture
+def kernel():
+    kernel = object.__new__(kernel_module.ModelxKernel)
+    kernel._init_mx_state()
+    return kernel
+
+
+@pytest.fixture
+def model():
+    m = mx.new_model()
+    yield m
+    m.close()
+
+
+def get_delta(kernel, fullname, since):
+    return loads_wire(kernel.mx_get_attrdict(fullname, since=since))
+
+
+def test_delta_after_tree_evicted(kernel, model):
+    spaces = [model.new_space() for _ in range(kernel_module._MAX_TREES)]
+    token = get_delta(kernel, model.fullname, 0)["token"]
+
+    # Trees of other objects evict the tree of the model,
+    # and counters of the tree made again restart.
+    for space in spaces:
+        get_delta(kernel, space.fullname, 0)
+    get_delta(kernel, model.fullname, 0)
+    model.new_space("Added")
+    kernel._mark_all_mutated()
+
+    delta = get_delta(kernel, model.fullname, token)
+
+    assert delta["full"]
+    assert any(path.endswith(".Added") for path in delta["changed"])
@@ -0,0 +1,43 @@
+import pytest
+
+mx = pytest.importorskip("modelx")
+pytest.importorskip("spyder_kernels")
+
+from spymx_kernels.console.kernel import ModelxKernel
+
+
+class _Kernel:
+    """Runs ModelxKernel methods without a frontend"""
+
+    _get_or_create_model = ModelxKernel._get_or_create_model
+    _define_item = ModelxKernel._define_item
+    mx_bulk_define = ModelxKernel.mx_bulk_define
+
+    def __init__(self):
+        self.added = []
+
+    def _mx_changed(self, added=(), removed=(), changed=()):
+        self.added.extend(added)
+
+
+@pytest.fixture
+def model():
+    m = mx.new_model()
+    yield m
+    m.close()
+
+
+def test_duplicate_definition(model):
+    kernel = _Kernel()
+    result = kernel.mx_bulk_define(model.name, [
+        {"type": "space", "name": "S"},
+        {"type": "cells", "parent": "S", "name": "foo"},
+        {"type": "space", "name": "S", "bases": ["NoSuchSpace"]}
+    ])
+    s, foo, dup = result["results"]
+
+    assert s == {"fullname": model.name + ".S", "error": None}
+    assert foo == {"fullname": model.name + ".S.foo", "error": None}
+    assert dup["fullname"] is None
+    assert "duplicate definition: S" in dup["error"]
+    assert kernel.added == [s["fullname"], foo["fullname"]]
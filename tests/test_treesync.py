@@ -0,0 +1,38 @@
+from spymx_kernels.utility.treesync import TreeVersions
+
+
+def test_delta_since_token():
+    versions = TreeVersions()
+    versions.update({"M": 1, "M.S": 1})
+    token = versions.issue()
+
+    versions.update({"M": 1, "M.S": 2, "M.T": 1})
+    since = versions.resolve(token)
+
+    assert since == 1
+    assert sorted(versions.changed_since(since)) == ["M.S", "M.T"]
+
+
+def test_token_of_dropped_tree():
+    # Counters of a tree made again restart, so tokens of the dropped
+    # tree must not be taken as issued by the new one.
+    old = TreeVersions()
+    old.update({"M": 1})
+    token = old.issue()
+
+    new = TreeVersions()
+    new.update({"M": 1})
+    new.update({"M": 2})
+
+    assert new.token >= token[1]
+    assert new.resolve(token) == 0
+
+
+def test_invalid_tokens():
+    versions = TreeVersions()
+    versions.update({"M": 1})
+
+    assert versions.resolve(0) == 0
+    assert versions.resolve(5) == 0
+    assert versions.resolve((versions.epoch, versions.token + 1)) == 0
+    assert versions.resolve(versions.issue()) == versions.token